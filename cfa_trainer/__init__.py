@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+CFA formula trainer core: the formula bank, question selection and grading.
+
+Nothing here imports Streamlit; CFA_formulas1.py is the UI on top of it.
+"""
+
+from .bank import Formula, FormulaBank, load_bank
+from .deck import Deck
+from .quiz import OPTION_COUNT, ORDERS, TIMER_SECONDS, QuizSession, is_correct
+
+__all__ = [
+    "Deck",
+    "Formula",
+    "FormulaBank",
+    "OPTION_COUNT",
+    "ORDERS",
+    "QuizSession",
+    "TIMER_SECONDS",
+    "is_correct",
+    "load_bank",
+]
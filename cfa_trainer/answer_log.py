@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent answer log.
+
+Every graded answer is appended to a local SQLite database (WAL mode).
+record() only puts the row on an in-memory queue; a single background
+writer thread drains the queue and inserts rows in batches, so the
+request path never waits on disk.
+
+A failed write (database locked, disk full...) is logged and the same
+batch retried with exponential backoff. The queue is bounded: while the
+database stays unwritable, answers beyond MAX_QUEUED are dropped with a
+warning instead of growing memory without limit. close() stops the
+retrying after CLOSE_RETRIES more attempts and waits at most CLOSE_SECONDS
+for the writer, so shutdown never hangs on a broken database.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass
+from pathlib import Path
+
+# Next to the app (the package's parent directory) unless CFA_TRAINER_DB says otherwise.
+DB_PATH = Path(os.environ.get("CFA_TRAINER_DB") or Path(__file__).resolve().parent.parent / "answers.db")
+BATCH_SIZE = 256
+FLUSH_SECONDS = 0.5
+MAX_QUEUED = 10_000
+RETRY_SECONDS = 0.5     # first backoff after a failed write, doubled up to MAX_RETRY_SECONDS
+MAX_RETRY_SECONDS = 30.0
+CLOSE_RETRIES = 3       # attempts per batch once close() was called
+CLOSE_SECONDS = 10.0    # longest close() waits for the writer
+HISTORY_PER_FORMULA = 50  # latest answers per formula replayed by history()
+ANONYMOUS = "anonymous"   # default trainee, shared by everyone who gives no name
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    formula_id TEXT NOT NULL,
+    chosen_id TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    answered_at REAL NOT NULL,
+    answer_seconds REAL,
+    think_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS answers_user ON answers (user, answered_at);
+CREATE INDEX IF NOT EXISTS answers_formula ON answers (formula_id, answered_at);
+CREATE INDEX IF NOT EXISTS answers_time ON answers (answered_at);
+"""
+
+INSERT = """
+INSERT INTO answers (user, formula_id, chosen_id, correct, answered_at,
+                     answer_seconds, think_seconds)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# -------------------------------------------------
+# RECORDS
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Answer:
+    user: str
+    formula_id: str   # correct id
+    chosen_id: str
+    correct: bool
+    answered_at: float
+    answer_seconds: float = None  # from options shown to "Check"
+    think_seconds: float = None   # length of the think phase
+
+
+def connect(path=DB_PATH):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+# -------------------------------------------------
+# BACKGROUND WRITER
+# -------------------------------------------------
+
+
+class AnswerLog:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._queue = queue.Queue(maxsize=MAX_QUEUED)
+        self._stop = object()
+        self._closing = threading.Event()
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="answer-log", daemon=True)
+        self._thread.start()
+
+    def record(self, answer):
+        """Queue an Answer for writing; returns immediately."""
+        if not self._thread.is_alive():
+            log.warning("Answer log writer stopped; restarting it")
+            self._start()
+        try:
+            self._queue.put_nowait(answer)
+        except queue.Full:
+            with self._dropped_lock:
+                if not self._dropped:
+                    log.warning("Answer log queue is full (%d); dropping answers until it drains", MAX_QUEUED)
+                self._dropped += 1
+        else:
+            with self._dropped_lock:
+                if self._dropped:
+                    log.warning("Answer log dropped %d answers", self._dropped)
+                    self._dropped = 0
+
+    def close(self, timeout=CLOSE_SECONDS):
+        """Flush queued answers and stop the writer, waiting at most `timeout` seconds."""
+        self._closing.set()
+        if self._thread.is_alive():
+            try:
+                self._queue.put_nowait(self._stop)
+            except queue.Full:
+                pass  # the writer stops on its own once the queue is empty
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                log.error("Answer log writer did not finish within %.0f s; %d answers unwritten",
+                          timeout, self._queue.qsize())
+
+    def _run(self):
+        conn = None
+        try:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=FLUSH_SECONDS)]
+                except queue.Empty:
+                    if self._closing.is_set():
+                        return
+                    continue
+                deadline = time.monotonic() + FLUSH_SECONDS
+                try:
+                    while len(batch) < BATCH_SIZE and batch[-1] is not self._stop:
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    pass
+
+                stop = batch[-1] is self._stop
+                rows = [astuple(a) for a in batch if a is not self._stop]
+                conn = self._write(conn, rows, stop)
+                if stop:
+                    return
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _write(self, conn, rows, stopping):
+        """Insert `rows`, retrying with backoff until close(); returns the (re)opened connection."""
+        delay = RETRY_SECONDS
+        attempts = 0
+        while rows:
+            try:
+                if conn is None:
+                    conn = connect(self.path)
+                with conn:
+                    conn.executemany(INSERT, rows)
+                return conn
+            except sqlite3.Error:
+                attempts += 1
+                log.exception("Could not write %d answers to %s (attempt %d)", len(rows), self.path, attempts)
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                if (stopping or self._closing.is_set()) and attempts >= CLOSE_RETRIES:
+                    log.error("Giving up on %d answers at shutdown", len(rows))
+                    return conn
+                # close() wakes the wait, so the last retries do not sleep.
+                self._closing.wait(delay)
+                delay = min(2 * delay, MAX_RETRY_SECONDS)
+        return conn
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log():
+    """Process-wide AnswerLog, started on first use."""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = AnswerLog()
+            atexit.register(_log.close)
+        return _log
+
+
+def history(user, path=DB_PATH, per_formula=HISTORY_PER_FORMULA):
+    """One user's latest `per_formula` answers to each formula, oldest first.
+
+    The shared ANONYMOUS user has no history of its own: its rows mix every
+    unnamed trainee, so replaying them would merge unrelated schedules.
+    """
+    if not user or user == ANONYMOUS:
+        return []
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT user, formula_id, chosen_id, correct, answered_at, answer_seconds, think_seconds"
+            " FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY formula_id ORDER BY answered_at DESC)"
+            "       AS recent FROM answers WHERE user = ?)"
+            " WHERE recent <= ? ORDER BY answered_at",
+            (user, per_formula),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [Answer(*row[:3], bool(row[3]), *row[4:]) for row in rows]
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Formula bank loader.
+
+The bank lives in formulas.json. It is read and validated once per process
+and published as an immutable FormulaBank shared by every session and rerun.
+"""
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+
+BANK_PATH = Path(__file__).with_name("formulas.json")
+REQUIRED_KEYS = ("id", "section", "question", "formula", "trap")
+
+# -------------------------------------------------
+# BANK STRUCTURE
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Formula:
+    id: str
+    section: str
+    question: str
+    formula: str
+    trap: str
+
+
+# Compared and hashed by identity, so per-bank caches key on the loaded bank.
+@dataclass(frozen=True, slots=True, eq=False)
+class FormulaBank:
+    formulas: tuple             # Formula entries, in bank order
+    ids: tuple                  # formula ids, in bank order
+    index: MappingProxyType     # id -> position in formulas
+    sections: MappingProxyType  # section -> tuple of positions
+
+    def __len__(self):
+        return len(self.formulas)
+
+    def __getitem__(self, formula_id):
+        return self.formulas[self.index[formula_id]]
+
+    def __contains__(self, formula_id):
+        return formula_id in self.index
+
+# -------------------------------------------------
+# LOADING & VALIDATION
+# -------------------------------------------------
+
+
+def build_bank(records):
+    formulas = []
+    index = {}
+    sections = {}
+
+    for position, record in enumerate(records):
+        values = {key: str(record.get(key) or "").strip() for key in REQUIRED_KEYS}
+        missing = [key for key, value in values.items() if not value]
+        if missing:
+            raise ValueError(
+                f"Formula #{position} ({values['id'] or '?'}) is missing "
+                f"or has empty: {', '.join(missing)}"
+            )
+
+        formula = Formula(**values)
+        if formula.id in index:
+            raise ValueError(f"Duplicate formula id: {formula.id}")
+
+        index[formula.id] = position
+        sections.setdefault(formula.section, []).append(position)
+        formulas.append(formula)
+
+    return FormulaBank(
+        formulas=tuple(formulas),
+        ids=tuple(index),
+        index=MappingProxyType(index),
+        sections=MappingProxyType({name: tuple(pos) for name, pos in sections.items()}),
+    )
+
+
+@lru_cache(maxsize=None)
+def load_bank(path=BANK_PATH):
+    with open(path, encoding="utf-8") as f:
+        return build_bank(json.load(f))
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Terminal front end.
+
+    python -m cfa_trainer play [--user NAME] [--seed N] [--timer S]
+    python -m cfa_trainer questions --seed N --count K
+    python -m cfa_trainer grade --seed N ANSWERS_FILE
+    python -m cfa_trainer returns LEDGER [--chunk-rows N]
+
+"play" runs the same think / options / feedback loop as the Streamlit app.
+"questions" prints the question stream for a seed, and "grade" scores an
+answers file against that same stream without any interaction. An answers
+file has one line per question: an option number (1-4) or the id of one
+of the offered formulas; anything else (e.g. "-") counts as skipped.
+"returns" streams an account ledger (CSV or binary, see cfa_trainer.ledger)
+and prints each account's annualized TWRR and MWRR side by side.
+"""
+
+import argparse
+import sys
+import time
+
+from .answer_log import ANONYMOUS, get_log, history
+from .bank import load_bank
+from .distractors import DIFFICULTIES
+from .ledger import CHUNK_ROWS, account_returns, read_ledger
+from .quiz import ORDERS, TIMER_SECONDS, QuizSession
+
+# -------------------------------------------------
+# QUESTION STREAM
+# -------------------------------------------------
+
+
+def stream(bank, seed, difficulty="hard"):
+    """Endless (question, options) stream, fixed by the seed."""
+    quiz = QuizSession.start(bank, seed=seed)
+    while True:
+        question = quiz.next_question("deck")
+        yield question, quiz.options(question, difficulty)
+
+
+def print_question(number, bank, question, out=sys.stdout):
+    print(f"\n📌 Question {number}: {bank[question].question}", file=out)
+
+
+def print_options(bank, options, out=sys.stdout):
+    for i, option in enumerate(options, 1):
+        print(f"  {i}. {bank[option].formula}", file=out)
+
+
+def parse_answer(text, options):
+    """Formula id picked by an answer line, or None if skipped/invalid."""
+    text = text.strip()
+    if text.isdigit() and 1 <= int(text) <= len(options):
+        return options[int(text) - 1]
+    if text in options:
+        return text
+    return None
+
+# -------------------------------------------------
+# COMMANDS
+# -------------------------------------------------
+
+
+def countdown(seconds, out=sys.stdout):
+    for remaining in range(seconds, 0, -1):
+        print(f"\r⏳ Think... {remaining:2d} seconds", end="", file=out, flush=True)
+        time.sleep(1)
+    print("\r" + " " * 30 + "\r", end="", file=out, flush=True)
+
+
+def play(args):
+    bank = load_bank()
+    answers = () if args.no_log else history(args.user)
+    quiz = QuizSession.start(bank, user=args.user, seed=args.seed, answers=answers)
+    print(f"CFA Formula Trainer — seed {quiz.deck.seed}. Ctrl-D or 'q' to quit.")
+
+    answered = score = 0
+    try:
+        while True:
+            question = quiz.next_question(args.order)
+            options = quiz.options(question, args.difficulty)
+
+            start_time = time.time()
+            print_question(answered + 1, bank, question)
+            countdown(args.timer)
+            print_options(bank, options)
+
+            shown_at = time.time()
+            while (choice := parse_answer(text := input("Which formula applies? "), options)) is None:
+                if text.strip().lower() == "q":
+                    raise EOFError
+                print(f"  Enter 1-{len(options)}.")
+
+            answer = quiz.check(question, choice, start_time=start_time, shown_at=shown_at)
+            answered += 1
+            if not args.no_log:
+                get_log().record(answer)
+
+            if answer.correct:
+                score += 1
+                print("✅ Correct identification.")
+            else:
+                print("❌ Incorrect.")
+                print(f"Correct formula: {bank[question].formula}")
+                print(f"⚠️ Common trap: {bank[question].trap}")
+    except (EOFError, KeyboardInterrupt):
+        print(f"\n\nScore: {score}/{answered}")
+    return 0
+
+
+def questions(args):
+    bank = load_bank()
+    for number, (question, options) in enumerate(stream(bank, args.seed, args.difficulty), 1):
+        if number > args.count:
+            break
+        print_question(number, bank, question)
+        print_options(bank, options)
+    return 0
+
+
+def grade(args):
+    bank = load_bank()
+    with open(args.answers, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    correct = skipped = 0
+    for number, (line, (question, options)) in enumerate(
+        zip(lines, stream(bank, args.seed, args.difficulty)), 1
+    ):
+        choice = parse_answer(line, options)
+        if choice is None:
+            skipped += 1
+            verdict = "skipped"
+        elif choice == question:
+            correct += 1
+            verdict = "correct"
+        else:
+            verdict = f"incorrect (trap: {bank[question].trap})"
+        print(f"{number}\t{question}\t{verdict}")
+
+    print(f"\nScore: {correct}/{len(lines)} ({skipped} skipped)")
+    return 0
+
+
+def returns(args):
+    result = account_returns(read_ledger(args.ledger, args.chunk_rows))
+    print("account\tyears\ttwrr\tmwrr\tmwrr-twrr")
+    for account, years, twrr, mwrr in zip(
+        result.accounts, result.years, result.twrr_annual, result.mwrr_annual
+    ):
+        print(f"{account}\t{years:.2f}\t{twrr:.4%}\t{mwrr:.4%}\t{mwrr - twrr:+.4%}")
+    return 0
+
+# -------------------------------------------------
+# ENTRY POINT
+# -------------------------------------------------
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cfa_trainer", description="CFA formula trainer")
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, default="hard")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("play", help="interactive quiz in the terminal")
+    p.add_argument("--user", default=ANONYMOUS)
+    p.add_argument("--seed", type=int)
+    p.add_argument("--order", choices=ORDERS, default="spaced")
+    p.add_argument("--timer", type=int, default=TIMER_SECONDS, help="think time in seconds")
+    p.add_argument("--no-log", action="store_true", help="do not read or write the answer log")
+    p.set_defaults(run=play)
+
+    p = commands.add_parser("questions", help="print the question stream for a seed")
+    p.add_argument("--seed", type=int, required=True)
+    p.add_argument("--count", type=int, default=20)
+    p.set_defaults(run=questions)
+
+    p = commands.add_parser("grade", help="grade an answers file against a seed")
+    p.add_argument("--seed", type=int, required=True)
+    p.add_argument("answers")
+    p.set_defaults(run=grade)
+
+    p = commands.add_parser("returns", help="TWRR and MWRR per account from a ledger")
+    p.add_argument("ledger", help="CSV (account,time,value,flow) or binary ledger file")
+    p.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    p.set_defaults(run=returns)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.run(args)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Sparse confusion matrix: which wrong formula was picked for which answer.
+
+Rows are correct bank positions, columns the positions picked instead.
+Each "Check" updates one cell in O(1). Sampling a confused formula for a
+row uses a Walker/Vose alias table, rebuilt only when that row changed
+since it was last sampled, so draws are O(1).
+"""
+
+import random
+import threading
+
+from .answer_log import DB_PATH, connect
+
+# -------------------------------------------------
+# ALIAS TABLE
+# -------------------------------------------------
+
+
+class AliasTable:
+    def __init__(self, outcomes, weights):
+        n = len(outcomes)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.outcomes = tuple(outcomes)
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random):
+        i = rng.randrange(len(self.outcomes))
+        return self.outcomes[i if rng.random() < self.prob[i] else self.alias[i]]
+
+# -------------------------------------------------
+# CONFUSION MATRIX
+# -------------------------------------------------
+
+
+class ConfusionMatrix:
+    def __init__(self):
+        self.rows = {}    # correct position -> {chosen position: count}
+        self.top = {}     # correct position -> (count, chosen position)
+        self._tables = {}  # correct position -> AliasTable (dropped when stale)
+        self._lock = threading.Lock()
+
+    def update(self, correct, chosen):
+        if correct == chosen:
+            return
+        with self._lock:
+            row = self.rows.setdefault(correct, {})
+            count = row[chosen] = row.get(chosen, 0) + 1
+            if count > self.top.get(correct, (0, None))[0]:
+                self.top[correct] = (count, chosen)
+            self._tables.pop(correct, None)
+
+    def count(self, correct, chosen):
+        return self.rows.get(correct, {}).get(chosen, 0)
+
+    def most_confused(self, correct):
+        """Position most often picked instead of `correct`, or None."""
+        return self.top.get(correct, (0, None))[1]
+
+    def table(self, correct):
+        """Alias table over the wrong picks for `correct`, or None."""
+        table = self._tables.get(correct)
+        if table is None:
+            with self._lock:
+                row = self.rows.get(correct)
+                if not row:
+                    return None
+                table = self._tables[correct] = AliasTable(list(row), list(row.values()))
+        return table
+
+
+def from_answers(bank, answers):
+    """Confusion matrix from (formula_id, chosen_id) pairs."""
+    matrix = ConfusionMatrix()
+    for formula_id, chosen_id in answers:
+        if formula_id in bank and chosen_id in bank:
+            matrix.update(bank.index[formula_id], bank.index[chosen_id])
+    return matrix
+
+
+def from_log(bank, path=DB_PATH):
+    conn = connect(path)
+    try:
+        return from_answers(
+            bank, conn.execute("SELECT formula_id, chosen_id FROM answers WHERE correct = 0")
+        )
+    finally:
+        conn.close()
+
+
+_global = {}
+_global_lock = threading.Lock()
+
+
+def get_confusion(bank):
+    """Confusion matrix across all users; the log is read only on first use."""
+    with _global_lock:
+        if bank not in _global:
+            _global[bank] = from_log(bank)
+        return _global[bank]
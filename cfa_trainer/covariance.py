@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental covariance and correlation estimation on streaming returns.
+
+Three estimators, each fed one return vector (assets,) or one chunk
+(rows, assets) at a time; rows with a NaN are skipped:
+
+- CovarianceAccumulator: expanding window. Keeps the count, the mean and
+  the co-moment matrix Σ (x - mean)(x - mean)ᵀ. A single vector is a
+  rank-1 Welford update, O(n²); a chunk is reduced with one matrix product
+  and merged (Chan et al.), which is also how accumulators built on
+  separate chunks or processes combine. It also keeps three running sums
+  (Σ‖x‖², Σ‖x‖⁴, Σ‖x‖²·x) so the Ledoit–Wolf intensity for shrinking
+  towards a scaled identity comes out of the same single pass.
+- EWMACovariance: RiskMetrics-style exponentially weighted covariance of
+  zero-mean returns, S ← λ·S + (1 - λ)·x·xᵀ; a chunk is one weighted
+  product, and estimators over consecutive chunks merge.
+- RollingCovariance: trailing window of the last `window` rows, kept as a
+  ring buffer with running sums; each new row adds its cross product and
+  subtracts the one leaving the window. The sums are recomputed from the
+  buffer once every `window` rows so rounding does not build up.
+
+correlation() uses portfolio.correlation_from_covariance.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .portfolio import correlation_from_covariance
+
+DECAY = 0.94  # RiskMetrics daily
+
+
+def _rows(returns):
+    """2-D (rows, assets) view with incomplete rows dropped."""
+    r = np.asarray(returns, dtype=float)
+    r = r[None, :] if r.ndim == 1 else r
+    complete = ~np.isnan(r).any(axis=1)
+    return r if complete.all() else r[complete]
+
+# -------------------------------------------------
+# EXPANDING WINDOW
+# -------------------------------------------------
+
+
+@dataclass(slots=True)
+class CovarianceAccumulator:
+    count: int
+    mean: np.ndarray      # (assets,)
+    comoment: np.ndarray  # (assets, assets) Σ (x - mean)(x - mean)ᵀ
+    norm2: float          # Σ ‖x‖²
+    norm4: float          # Σ ‖x‖⁴
+    norm2_x: np.ndarray   # Σ ‖x‖²·x
+
+    @classmethod
+    def empty(cls, columns):
+        return cls(
+            count=0,
+            mean=np.zeros(columns),
+            comoment=np.zeros((columns, columns)),
+            norm2=0.0,
+            norm4=0.0,
+            norm2_x=np.zeros(columns),
+        )
+
+    @classmethod
+    def from_returns(cls, returns):
+        """Accumulator for one in-memory chunk, (rows, assets)."""
+        r = _rows(returns)
+        if not len(r):
+            return cls.empty(r.shape[1])
+        mean = r.mean(axis=0)
+        centred = r - mean
+        squares = np.einsum("ij,ij->i", r, r)
+        return cls(
+            count=len(r),
+            mean=mean,
+            comoment=centred.T @ centred,
+            norm2=float(squares.sum()),
+            norm4=float(squares @ squares),
+            norm2_x=squares @ r,
+        )
+
+    def update(self, returns):
+        """Fold in one return vector (rank-1, O(n²)) or a chunk of rows."""
+        r = _rows(returns)
+        if len(r) != 1:
+            return self.merge(CovarianceAccumulator.from_returns(r))
+        x = r[0]
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.comoment += np.outer(delta, x - self.mean)
+        square = float(x @ x)
+        self.norm2 += square
+        self.norm4 += square * square
+        self.norm2_x += square * x
+        return self
+
+    def merge(self, other):
+        """Combine another accumulator over the same assets into this one."""
+        total = self.count + other.count
+        if not other.count:
+            return self
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * (self.count * other.count / total)
+        self.mean = self.mean + delta * (other.count / total)
+        self.count = total
+        self.norm2 += other.norm2
+        self.norm4 += other.norm4
+        self.norm2_x = self.norm2_x + other.norm2_x
+        return self
+
+    def covariance(self, ddof=1):
+        if self.count <= ddof:
+            return np.full_like(self.comoment, np.nan)
+        return self.comoment / (self.count - ddof)
+
+    def correlation(self):
+        return correlation_from_covariance(self.covariance())[0]
+
+    def shrunk(self):
+        """Ledoit–Wolf (2004) shrinkage towards μ·I: (covariance, intensity)."""
+        n, p = self.count, len(self.mean)
+        if n < 2:
+            return np.full_like(self.comoment, np.nan), np.nan
+        sample = self.comoment / n
+        mu = np.trace(sample) / p
+        target = mu * np.eye(p)
+        # Squared norms are Frobenius norms divided by p, as in the paper.
+        d2 = np.sum((sample - target) ** 2) / p
+        # Σ_t ‖x_t - mean‖⁴ from the running sums.
+        m = self.mean
+        c = float(m @ m)
+        centred4 = (self.norm4 + 4.0 * (m @ self.comoment @ m) - 4.0 * (m @ self.norm2_x)
+                    + 2.0 * c * self.norm2 + n * c * c)
+        b2 = max(centred4 / p - n * np.sum(sample ** 2) / p, 0.0) / n**2
+        intensity = min(b2, d2) / d2 if d2 > 0 else 1.0
+        return intensity * target + (1.0 - intensity) * sample, intensity
+
+# -------------------------------------------------
+# EXPONENTIAL WEIGHTING
+# -------------------------------------------------
+
+
+@dataclass(slots=True)
+class EWMACovariance:
+    decay: float
+    count: int
+    matrix: np.ndarray  # Σ (1 - λ)·λ^age·x·xᵀ
+
+    @classmethod
+    def empty(cls, columns, decay=DECAY):
+        if not 0.0 < decay < 1.0:
+            raise ValueError(f"Decay must be in (0, 1), got {decay}")
+        return cls(decay=decay, count=0, matrix=np.zeros((columns, columns)))
+
+    def update(self, returns):
+        """Fold in a return vector or a chunk of rows, oldest first."""
+        r = _rows(returns)
+        m = len(r)
+        weights = (1.0 - self.decay) * self.decay ** np.arange(m - 1, -1, -1)
+        self.matrix = self.decay**m * self.matrix + (r.T * weights) @ r
+        self.count += m
+        return self
+
+    def merge(self, later):
+        """Combine with an estimator (same decay) over the rows that follow this one's."""
+        if later.decay != self.decay:
+            raise ValueError(f"Cannot merge decays {self.decay} and {later.decay}")
+        self.matrix = self.decay**later.count * self.matrix + later.matrix
+        self.count += later.count
+        return self
+
+    def covariance(self, adjust=True):
+        """The EWMA matrix; `adjust` rescales the weights to sum to 1 early on."""
+        if adjust and self.count:
+            return self.matrix / (1.0 - self.decay**self.count)
+        return self.matrix
+
+    def correlation(self):
+        return correlation_from_covariance(self.covariance())[0]
+
+# -------------------------------------------------
+# ROLLING WINDOW
+# -------------------------------------------------
+
+
+class RollingCovariance:
+    """Covariance of the last `window` rows; memory is window × assets + assets²."""
+
+    def __init__(self, window, columns):
+        if window < 2:
+            raise ValueError(f"Window must be at least 2, got {window}")
+        self.window = window
+        self._buffer = np.zeros((window, columns))
+        self._next = 0      # ring position of the next row
+        self.count = 0      # rows currently in the window
+        self._since = 0     # rows added since the sums were last recomputed
+        self._sum = np.zeros(columns)
+        self._cross = np.zeros((columns, columns))
+
+    def update(self, returns):
+        """Add a return vector or a chunk of rows; O(n²) per row."""
+        r = _rows(returns)[-self.window:]
+        m = len(r)
+        slots = (self._next + np.arange(m)) % self.window
+        # Slots past the free space hold the oldest rows, which leave the window.
+        leaving = self._buffer[slots[self.window - self.count:]]
+        self._sum += r.sum(axis=0) - leaving.sum(axis=0)
+        self._cross += r.T @ r - leaving.T @ leaving
+        self._buffer[slots] = r
+        self._next = (self._next + m) % self.window
+        self.count = min(self.count + m, self.window)
+        self._since += m
+        if self._since >= self.window:
+            self._recompute()
+        return self
+
+    def _recompute(self):
+        rows = self._buffer if self.count == self.window else self._buffer[:self.count]
+        self._sum = rows.sum(axis=0)
+        self._cross = rows.T @ rows
+        self._since = 0
+
+    def covariance(self, ddof=1):
+        n = self.count
+        if n <= ddof:
+            return np.full_like(self._cross, np.nan)
+        mean = self._sum / n
+        return (self._cross - n * np.outer(mean, mean)) / (n - ddof)
+
+    def correlation(self):
+        return correlation_from_covariance(self.covariance())[0]
+
+# -------------------------------------------------
+# STREAMS
+# -------------------------------------------------
+
+
+def accumulate(chunks):
+    """CovarianceAccumulator over a stream of (rows, assets) chunks."""
+    accumulator = None
+    for chunk in chunks:
+        part = CovarianceAccumulator.from_returns(chunk)
+        accumulator = part if accumulator is None else accumulator.merge(part)
+    if accumulator is None:
+        raise ValueError("No returns to accumulate")
+    return accumulator
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Term-structure engine: spot rates bootstrapped from par yields, the full
+matrix of implied forward rates, and repricing off the curve.
+
+Rates are per period (t = 1, 2, ... periods, as in PRESENT_VALUE_SPOT).
+Every function takes one curve, shape (tenors,), or a stack of scenario
+curves, shape (curves, tenors), and works on whole arrays:
+
+- Bootstrapping. A par bond prices at 1, so with A_n = d_1 + ... + d_n,
+  1 = c_n·A_n + d_n, i.e. A_n = (A_(n-1) + 1) / (1 + c_n). That recurrence
+  is linear, so A_n = P_n · Σ_(k<n) 1/P_k with P_n = Π 1/(1 + c_k): one
+  cumulative sum and one cumulative product (in logs) per curve.
+- Forwards. f(i, j) = (d_i / d_j)^(1/(j-i)) - 1, the rate from period i to
+  period j, for all pairs at once; f(0, j) = z_j and f(1, 2) is the 2y1y
+  rate of FORWARD_RATE_2Y_1Y when periods are years.
+- Pricing. A (bonds, tenors) cash-flow matrix times the discount factors
+  is one matrix product, for one curve or every scenario.
+
+curve_from_par() and curve_from_spot() are cached by their inputs, so a
+curve rebuilt from the same quotes is not bootstrapped again.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+CACHE_SIZE = 256
+
+# -------------------------------------------------
+# CURVE
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Curve:
+    spot: np.ndarray      # (..., tenors) z_1 .. z_n
+    discount: np.ndarray  # (..., tenors + 1) d_0 = 1, d_1 .. d_n
+    forward: np.ndarray   # (..., tenors + 1, tenors + 1) f(i, j), NaN unless i < j
+
+    @property
+    def tenors(self):
+        return self.spot.shape[-1]
+
+    def par(self):
+        """Par yields that reprice this curve: (1 - d_n) / A_n."""
+        d = self.discount[..., 1:]
+        return (1.0 - d) / np.cumsum(d, axis=-1)
+
+    def forward_rate(self, start, end):
+        """f(start, end) per curve; start and end are periods from today."""
+        return self.forward[..., start, end]
+
+    def price(self, cash_flows):
+        """PV of each cash-flow row (t = 1, 2, ...): (bonds,) or (bonds, curves)."""
+        cf = np.asarray(cash_flows, dtype=float)
+        periods = cf.shape[-1]
+        if periods > self.tenors:
+            raise ValueError(f"Cash flows run {periods} periods, the curve only {self.tenors}")
+        return cf @ self.discount[..., 1:periods + 1].T
+
+
+def _forward_matrix(log_d):
+    steps = np.arange(log_d.shape[-1])
+    span = steps[None, :] - steps[:, None]
+    forward = np.expm1((log_d[..., :, None] - log_d[..., None, :]) / span)
+    return np.where(span > 0, forward, np.nan)
+
+
+def _from_discount(discount):
+    # Quotes implying a non-positive discount factor (an arbitrage) give NaN rates.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_d = np.log(discount)
+        n = np.arange(1, discount.shape[-1])
+        spot = np.expm1(-log_d[..., 1:] / n)
+        return Curve(spot=spot, discount=discount, forward=_forward_matrix(log_d))
+
+# -------------------------------------------------
+# BUILDERS
+# -------------------------------------------------
+
+
+def bootstrap(par_yields):
+    """Curve(s) from par yields for tenors 1..n periods (annual-pay par bonds per period)."""
+    c = np.asarray(par_yields, dtype=float)
+    if np.any(c <= -1.0):
+        raise ValueError("Par yields must be above -100%")
+    # log P_n = -Σ log(1 + c_k); A_n = Σ_(k<n) exp(log P_n - log P_k).
+    log_p = -np.cumsum(np.log1p(c), axis=-1)
+    previous = np.concatenate([np.zeros(c.shape[:-1] + (1,)), log_p[..., :-1]], axis=-1)
+    # Scale by the last log P before exponentiating so long curves do not overflow.
+    shift = log_p[..., -1:]
+    annuity = np.exp(log_p - shift) * np.cumsum(np.exp(shift - previous), axis=-1)
+    discount = np.diff(annuity, axis=-1, prepend=0.0)
+    ones = np.ones(c.shape[:-1] + (1,))
+    return _from_discount(np.concatenate([ones, discount], axis=-1))
+
+
+def from_spot(spot_rates):
+    """Curve(s) from spot rates z_1..z_n."""
+    z = np.asarray(spot_rates, dtype=float)
+    if np.any(z <= -1.0):
+        raise ValueError("Spot rates must be above -100%")
+    n = np.arange(1, z.shape[-1] + 1)
+    ones = np.ones(z.shape[:-1] + (1,))
+    return _from_discount(np.concatenate([ones, (1.0 + z) ** -n], axis=-1))
+
+
+def curve_from_par(par_yields):
+    """Cached bootstrap(): the same quotes return the same (read-only) Curve."""
+    return _cached(bootstrap, *_key(par_yields))
+
+
+def curve_from_spot(spot_rates):
+    """Cached from_spot()."""
+    return _cached(from_spot, *_key(spot_rates))
+
+
+def _key(values):
+    a = np.ascontiguousarray(values, dtype=float)
+    return a.tobytes(), a.shape
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached(builder, data, shape):
+    curve = builder(np.frombuffer(data).reshape(shape))
+    for values in (curve.spot, curve.discount, curve.forward):
+        values.flags.writeable = False
+    return curve
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+No-repeat shuffled question deck.
+
+A Deck walks a pseudorandom permutation of range(size) without ever
+materializing it: position i of the shuffle is computed on demand with a
+small keyed Feistel network (cycle-walking keeps it inside range(size)).
+The whole state is a seed and a cursor, so a session can be replayed
+exactly from its seed. When the cursor passes the end of the deck the next
+pass uses a fresh shuffle derived from the same seed.
+"""
+
+import random
+from dataclasses import dataclass
+
+FEISTEL_ROUNDS = 4
+MASK64 = (1 << 64) - 1
+
+# -------------------------------------------------
+# KEYED PERMUTATION
+# -------------------------------------------------
+
+
+def _mix(x):
+    # splitmix64 finalizer
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def _round_keys(seed, epoch):
+    key = _mix(seed & MASK64) ^ _mix(epoch)
+    keys = []
+    for _ in range(FEISTEL_ROUNDS):
+        key = _mix(key)
+        keys.append(key)
+    return keys
+
+
+def permute(i, size, seed, epoch=0):
+    """Return the i-th element of the (seed, epoch) shuffle of range(size)."""
+    if not 0 <= i < size:
+        raise IndexError(f"deck position {i} out of range for size {size}")
+
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    half_mask = (1 << half_bits) - 1
+    keys = _round_keys(seed, epoch)
+
+    # Cycle-walk: the network permutes range(4**half_bits) >= size, so
+    # re-encrypt until the value lands back inside the deck.
+    x = i
+    while True:
+        left, right = x >> half_bits, x & half_mask
+        for key in keys:
+            left, right = right, left ^ (_mix(key ^ right) & half_mask)
+        x = (left << half_bits) | right
+        if x < size:
+            return x
+
+# -------------------------------------------------
+# DECK
+# -------------------------------------------------
+
+
+@dataclass(slots=True)
+class Deck:
+    size: int
+    seed: int
+    cursor: int = 0
+
+    @classmethod
+    def shuffled(cls, size, seed=None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        return cls(size=size, seed=seed)
+
+    @property
+    def epoch(self):
+        return self.cursor // self.size
+
+    def position(self, cursor):
+        epoch, i = divmod(cursor, self.size)
+        # Never repeat a card across a reshuffle: if a pass would open with
+        # the card that closed the previous one, swap its first two cards.
+        if epoch and self.size > 1 and i < 2:
+            last = permute(self.size - 1, self.size, self.seed, epoch - 1)
+            if permute(0, self.size, self.seed, epoch) == last:
+                i = 1 - i
+        return permute(i, self.size, self.seed, epoch)
+
+    def peek(self):
+        return self.position(self.cursor)
+
+    def draw(self):
+        position = self.peek()
+        self.cursor += 1
+        return position
+
+    def reshuffle(self):
+        """Skip the rest of the current pass and start a fresh shuffle."""
+        if self.cursor % self.size:
+            self.cursor = (self.epoch + 1) * self.size
+
+    def rng(self, draw=None):
+        """Per-draw generator, reproducible from (seed, draw); draw defaults to the cursor."""
+        return random.Random(f"{self.seed}/{self.cursor if draw is None else draw}")
+
+
+def replay(size, seed, count):
+    """Positions drawn by the first `count` draws of a deck with this seed."""
+    deck = Deck(size=size, seed=seed)
+    return [deck.draw() for _ in range(count)]
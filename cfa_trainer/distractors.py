@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Topic-aware distractor engine.
+
+build_index() runs once per bank load and precomputes, for every formula,
+a short ranked pool of plausible wrong answers: entries from the same
+section and entries whose formula shares (IDF-weighted) tokens with it.
+Entries that restate the same formula (same question text, or the same
+expression once labels, subscripts and E(·) are normalized away, as with
+CAPM / CAPM_EQUATION) are put in one group and never offered together.
+Picking distractors for a question is then O(k). The "confused" level
+samples the formulas trainees actually mistook for the answer instead.
+"""
+
+import heapq
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+DIFFICULTIES = ("easy", "medium", "hard", "confused")
+POOL_SIZE = 12
+SECTION_BONUS = 1.0
+
+SUBSCRIPT_DIGITS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+SUPERSCRIPTS = {"²": "^2", "ᵗ": "^t"}
+SUBSCRIPT_LETTERS = "ᵢₚₜₙ"
+
+# -------------------------------------------------
+# NORMALIZATION
+# -------------------------------------------------
+
+
+def canonical(formula):
+    """Expression part of a formula string, normalized for comparison."""
+    text = re.split(r":|\bsuch that\b", formula)[-1]
+    if "=" in text:
+        lhs, rhs = text.split("=", 1)
+        if rhs.strip() != "0" and len(lhs.split()) <= 2:
+            text = rhs
+
+    text = text.lower().translate(SUBSCRIPT_DIGITS)
+    for sup, plain in SUPERSCRIPTS.items():
+        text = text.replace(sup, plain)
+    text = re.sub(f"[{SUBSCRIPT_LETTERS}]", "", text)
+    text = text.replace("[", "(").replace("]", ")")
+    text = re.sub(r"(?<![a-z])e\(([^()]*)\)", r"\1", text)
+    return re.sub(r"[\s·×*]", "", text)
+
+
+def tokens(formula):
+    text = re.sub(f"[{SUBSCRIPT_LETTERS}]", "", formula.lower())
+    return frozenset(re.findall(r"[^\W\d_]+|\d+", text.translate(SUBSCRIPT_DIGITS)))
+
+# -------------------------------------------------
+# SIMILARITY INDEX
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class DistractorIndex:
+    groups: tuple  # position -> duplicate group id
+    pools: tuple   # position -> positions ranked by similarity
+
+
+def _duplicate_groups(bank):
+    parent = list(range(len(bank)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    seen = {}
+    for position, formula in enumerate(bank.formulas):
+        for key in (("q", formula.question.lower()), ("f", canonical(formula.formula))):
+            if key in seen:
+                parent[find(position)] = find(seen[key])
+            else:
+                seen[key] = position
+
+    return tuple(find(i) for i in range(len(bank)))
+
+
+def build_index(bank):
+    n = len(bank)
+    groups = _duplicate_groups(bank)
+    token_sets = [tokens(formula.formula) for formula in bank.formulas]
+
+    postings = {}
+    for position, toks in enumerate(token_sets):
+        for tok in toks:
+            postings.setdefault(tok, []).append(position)
+    idf = {tok: math.log((n + 1) / len(hits)) for tok, hits in postings.items()}
+
+    def weight(toks):
+        return sum(idf[tok] for tok in toks)
+
+    pools = []
+    for position, formula in enumerate(bank.formulas):
+        toks = token_sets[position]
+        candidates = set(bank.sections[formula.section])
+        for tok in toks:
+            candidates.update(postings[tok])
+
+        scored = []
+        for other in candidates:
+            if groups[other] == groups[position]:
+                continue
+            shared = toks & token_sets[other]
+            union = weight(toks | token_sets[other])
+            score = weight(shared) / union if union else 0.0
+            if bank.formulas[other].section == formula.section:
+                score += SECTION_BONUS
+            if score > 0:
+                scored.append((score, -other, other))
+
+        pools.append(tuple(other for _, _, other in heapq.nlargest(POOL_SIZE, scored)))
+
+    return DistractorIndex(groups=groups, pools=tuple(pools))
+
+
+@lru_cache(maxsize=None)
+def get_index(bank):
+    return build_index(bank)
+
+# -------------------------------------------------
+# SELECTION
+# -------------------------------------------------
+
+
+def distractors(bank, formula_id, k, rng, difficulty="hard", confusion=()):
+    """k textually distinct wrong answers (ids) for formula_id.
+
+    "confused" draws from the given ConfusionMatrix objects (e.g. the
+    user's, then the global one) before falling back to "hard".
+    """
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"Unknown difficulty {difficulty!r}; expected one of {DIFFICULTIES}")
+
+    index = get_index(bank)
+    answer = bank.index[formula_id]
+    pool = index.pools[answer]
+    if difficulty == "hard":
+        pool = pool[:k + 2]
+    elif difficulty == "easy":
+        pool = ()
+
+    used = {index.groups[answer]}
+    chosen = []
+
+    def take(position):
+        group = index.groups[position]
+        if group not in used:
+            used.add(group)
+            chosen.append(position)
+
+    if difficulty == "confused":
+        tables = [t for t in (matrix.table(answer) for matrix in confusion) if t]
+        for attempt in range(2 * k * len(tables)):
+            if len(chosen) == k:
+                break
+            take(tables[attempt % len(tables)].sample(rng))
+        pool = pool[:k + 2]
+
+    for position in rng.sample(pool, len(pool)):
+        if len(chosen) == k:
+            break
+        take(position)
+
+    # Top up with unrelated entries (the whole "easy" level works this way).
+    tries = 0
+    while len(chosen) < k:
+        tries += 1
+        if tries > 64 * k:
+            raise ValueError(f"Bank too small for {k} distinct distractors")
+        take(rng.randrange(len(bank)))
+
+    return [bank.ids[position] for position in chosen]
+
+
+def options(bank, formula_id, k, rng, difficulty="hard", confusion=()):
+    """formula_id plus k - 1 distractors, in random order."""
+    ids = distractors(bank, formula_id, k - 1, rng, difficulty, confusion)
+    ids.insert(rng.randint(0, k - 1), formula_id)
+    return tuple(ids)
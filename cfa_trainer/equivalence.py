@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Free-text answers graded by randomized numeric equivalence.
+
+A typed formula is parsed and compiled with cfa_trainer.expressions, then
+evaluated on the same batch of random inputs as the bank formula, in one
+vectorized call. If the two agree on every sample the answer is correct,
+so any rearrangement counts: "Debt / (Debt + Equity)" and
+"1 / (1 + Equity / Debt)" are the same formula.
+
+Typed answers are parsed strictly: a "-" is a minus unless the whole
+hyphenated word appears in one of the bank's variable names, so
+"Rm-Rf" and "Closing Price-Opening Price" are subtractions.
+
+The reference inputs and values are built once per formula id and typed
+answers are compiled once per text, so grading a submission costs one
+NumPy evaluation and a comparison (well under a millisecond).
+"""
+
+import re
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from .expressions import compile_expr, compiled, parse
+
+SAMPLES = 32
+SERIES_LENGTH = 5
+LOW, HIGH = 0.5, 2.0  # positive, away from 0, so ratios and roots stay defined
+RTOL = 1e-9
+ATOL = 1e-12
+
+# -------------------------------------------------
+# REFERENCE
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Reference:
+    expression: object
+    inputs: dict          # argument -> (SAMPLES,) or (SAMPLES, SERIES_LENGTH)
+    values: np.ndarray    # the bank formula on those inputs
+    keys: dict            # loose spelling ("closingprice") -> argument
+
+    @property
+    def counted(self):
+        """True when n is the series length rather than a sampled input."""
+        return bool(self.expression.series)
+
+
+def _key(argument):
+    return argument.replace("_", "")
+
+
+def gradable(bank, formula_id):
+    """Whether free-text answers can be checked for this formula."""
+    return not compiled(bank, formula_id)[0].descriptive
+
+
+@lru_cache(maxsize=None)
+def hyphenated_words(bank):
+    """Lower-case hyphenated words in the bank's variable names ("after-tax")."""
+    return frozenset(
+        word.lower()
+        for formula_id in bank.ids
+        for name in compiled(bank, formula_id)[0].variables
+        for word in re.split(r"[\s()]+", name)
+        if "-" in word
+    )
+
+
+@lru_cache(maxsize=None)
+def reference(bank, formula_id):
+    expression, func = compiled(bank, formula_id)
+    if func is None:
+        raise ValueError(f"{formula_id} is descriptive: {expression.reason}")
+
+    rng = np.random.default_rng(zlib.crc32(formula_id.encode()))
+    inputs = {}
+    for argument in expression.arguments:
+        if argument in expression.series:
+            inputs[argument] = rng.uniform(LOW, HIGH, (SAMPLES, SERIES_LENGTH))
+        elif not (argument == "n" and expression.series):
+            inputs[argument] = rng.uniform(LOW, HIGH, SAMPLES)
+    for values in inputs.values():
+        values.flags.writeable = False
+
+    with np.errstate(all="ignore"):
+        values = np.broadcast_to(func(**inputs), (SAMPLES,))
+    return Reference(
+        expression=expression,
+        inputs=inputs,
+        values=values,
+        keys={_key(argument): argument for argument in expression.arguments},
+    )
+
+# -------------------------------------------------
+# GRADING
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Verdict:
+    correct: bool
+    reason: str = ""  # why an answer could not be accepted
+
+
+@lru_cache(maxsize=4096)
+def _compile_answer(text, hyphenated):
+    expression = parse(text, hyphenated)
+    return expression, None if expression.descriptive else compile_expr(expression)
+
+
+def check(bank, formula_id, text):
+    """Grade a typed formula for `formula_id`."""
+    ref = reference(bank, formula_id)
+    body = text.strip()
+    if not body:
+        return Verdict(False, "No formula entered.")
+    try:
+        expression, func = _compile_answer(body, hyphenated_words(bank))
+    except (SyntaxError, ValueError) as exc:
+        return Verdict(False, f"Could not read the formula: {exc}")
+    except (RecursionError, MemoryError):
+        return Verdict(False, "Could not read the formula: nested too deeply.")
+    if func is None:
+        return Verdict(False, f"Could not read the formula: {expression.reason}")
+
+    inputs, unknown = {}, []
+    for argument, name in zip(expression.arguments, expression.variables):
+        matched = ref.keys.get(_key(argument))
+        if matched in ref.inputs:
+            inputs[argument] = ref.inputs[matched]
+        elif argument == "n" and ref.counted:
+            if not expression.series:
+                inputs[argument] = SERIES_LENGTH
+        else:
+            unknown.append(name)
+    if unknown:
+        return Verdict(False, (
+            f"Unknown variable(s): {', '.join(unknown)}."
+            f" This formula uses {', '.join(ref.expression.variables)}."
+        ))
+
+    try:
+        with np.errstate(all="ignore"):
+            values = np.asarray(func(**inputs), dtype=float)
+    except (ValueError, TypeError, ArithmeticError, RecursionError):
+        return Verdict(False, "The formula cannot be evaluated with these variables.")
+    if values.shape not in ((), (SAMPLES,)):
+        return Verdict(False, "Series and single values are mixed up.")
+    return Verdict(bool(equivalent(ref.values, values)))
+
+
+def equivalent(expected, actual):
+    """Same value on every sample where the reference is defined."""
+    expected, actual = np.broadcast_arrays(expected, actual)
+    defined = np.isfinite(expected)
+    if defined.sum() < len(expected) // 2:
+        return False
+    return np.allclose(actual[defined], expected[defined], rtol=RTOL, atol=ATOL)
@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+"""
+Numeric evaluators for the formula bank.
+
+EVALUATORS maps a formula id to a NumPy function. Inputs are keyword
+arguments that broadcast against each other, so one call evaluates any
+number of scenarios; series inputs (returns, cash flows, weights...) run
+along `axis`, the last one by default. Formulas that describe a concept
+rather than a calculation (e.g. CML_SCOPE, OAS) have no evaluator; see
+DESCRIPTIVE.
+
+    evaluate("GEOM_MEAN", returns=returns_matrix, axis=1)
+    evaluate("WACC", wd=0.4, rd=rd_grid, t=0.25, we=0.6, re=0.1)
+"""
+
+import inspect
+
+import numpy as np
+
+from .irr import solve_irr
+from .spreads import solve_z_spread
+
+EVALUATORS = {}
+
+DESCRIPTIVE = frozenset({
+    "MINIMUM_VARIANCE_EFFECT",
+    "CML_SCOPE",
+    "BENCHMARK_SPOT_RATES",
+    "FORWARD_RATES_INTERPRETATION",
+    "OAS",
+})
+
+# -------------------------------------------------
+# REGISTRY
+# -------------------------------------------------
+
+
+def evaluator(*formula_ids):
+    def register(func):
+        for formula_id in formula_ids:
+            if formula_id in EVALUATORS:
+                raise ValueError(f"Duplicate evaluator for {formula_id}")
+            EVALUATORS[formula_id] = func
+        return func
+    return register
+
+
+def evaluate(formula_id, **inputs):
+    try:
+        func = EVALUATORS[formula_id]
+    except KeyError:
+        raise KeyError(f"No evaluator for formula {formula_id!r}") from None
+    return func(**inputs)
+
+
+def inputs(formula_id):
+    """Names of the inputs an evaluator takes (excluding options like axis)."""
+    params = inspect.signature(EVALUATORS[formula_id]).parameters.values()
+    return tuple(p.name for p in params if p.default is inspect.Parameter.empty)
+
+
+def _periods(values, axis):
+    """1, 2, ..., n along `axis`, shaped to broadcast against values."""
+    values = np.asarray(values, dtype=float)
+    n = values.shape[axis]
+    shape = [1] * values.ndim
+    shape[axis] = n
+    return np.arange(1, n + 1, dtype=float).reshape(shape)
+
+# -------------------------------------------------
+# RETURN MEASURES
+# -------------------------------------------------
+
+
+@evaluator("HPR")
+def holding_period_return(opening_price, closing_price, income=0.0):
+    opening_price = np.asarray(opening_price, dtype=float)
+    return (closing_price - opening_price + income) / opening_price
+
+
+@evaluator("MULTI_HPR")
+def compound_return(returns, axis=-1):
+    return np.expm1(np.log1p(np.asarray(returns, dtype=float)).sum(axis=axis))
+
+
+@evaluator("ARITH_MEAN")
+def arithmetic_mean(returns, axis=-1):
+    return np.mean(returns, axis=axis)
+
+
+@evaluator("GEOM_MEAN", "TWRR")
+def geometric_mean(returns, axis=-1):
+    return np.expm1(np.log1p(np.asarray(returns, dtype=float)).mean(axis=axis))
+
+
+@evaluator("HARM_MEAN")
+def harmonic_mean(values, axis=-1):
+    values = np.asarray(values, dtype=float)
+    return values.shape[axis] / np.sum(1.0 / values, axis=axis)
+
+
+@evaluator("MWRR", "IRR")
+def internal_rate_of_return(cash_flows, axis=-1, guess=0.1):
+    """Rate with Σ CF_t / (1+r)^t = 0 (t = 0, 1, ...); see cfa_trainer.irr."""
+    cf = np.moveaxis(np.asarray(cash_flows, dtype=float), axis, -1)
+    result = solve_irr(cf.reshape(-1, cf.shape[-1]), guess=guess)
+    return result.rate.reshape(cf.shape[:-1])
+
+# -------------------------------------------------
+# SOLVENCY, LIQUIDITY & PROFITABILITY RATIOS
+# -------------------------------------------------
+
+
+@evaluator("DEBT_TO_EQUITY")
+def debt_to_equity(total_debt, total_equity):
+    return np.divide(total_debt, total_equity)
+
+
+@evaluator("DEBT_TO_ASSETS")
+def debt_to_assets(total_debt, total_assets):
+    return np.divide(total_debt, total_assets)
+
+
+@evaluator("DEBT_TO_CAPITAL")
+def debt_to_capital(debt, equity):
+    debt = np.asarray(debt, dtype=float)
+    return debt / (debt + equity)
+
+
+@evaluator("FINANCIAL_LEVERAGE")
+def financial_leverage(average_assets, average_equity):
+    return np.divide(average_assets, average_equity)
+
+
+@evaluator("INTEREST_COVERAGE")
+def interest_coverage(ebit, interest_expense):
+    return np.divide(ebit, interest_expense)
+
+
+@evaluator("CURRENT_RATIO")
+def current_ratio(current_assets, current_liabilities):
+    return np.divide(current_assets, current_liabilities)
+
+
+@evaluator("CASH_RATIO")
+def cash_ratio(cash, marketable_securities, current_liabilities):
+    return np.add(cash, marketable_securities) / current_liabilities
+
+
+@evaluator("QUICK_RATIO")
+def quick_ratio(cash, marketable_securities, accounts_receivable, current_liabilities):
+    return (np.add(cash, marketable_securities) + accounts_receivable) / current_liabilities
+
+
+@evaluator("DEFENSIVE_INTERVAL")
+def defensive_interval(cash, marketable_securities, accounts_receivable, daily_expenses):
+    return (np.add(cash, marketable_securities) + accounts_receivable) / daily_expenses
+
+
+@evaluator("CASH_CONVERSION_CYCLE", "CASH_CONVERSION_CYCLE_CF")
+def cash_conversion_cycle(days_inventory, days_receivables, days_payables):
+    return np.add(days_inventory, days_receivables) - days_payables
+
+
+@evaluator("NET_PROFIT_MARGIN")
+def net_profit_margin(net_income, sales):
+    return np.divide(net_income, sales)
+
+
+@evaluator("GROSS_PROFIT_MARGIN")
+def gross_profit_margin(gross_profit, sales):
+    return np.divide(gross_profit, sales)
+
+
+@evaluator("OPERATING_MARGIN")
+def operating_margin(ebit, sales):
+    return np.divide(ebit, sales)
+
+
+@evaluator("PRETAX_MARGIN")
+def pretax_margin(earnings_before_tax, sales):
+    return np.divide(earnings_before_tax, sales)
+
+# -------------------------------------------------
+# FIRM VALUE, WORKING CAPITAL & CASH FLOW
+# -------------------------------------------------
+
+
+@evaluator("MARKET_CAP")
+def market_cap(share_price, shares_outstanding):
+    return np.multiply(share_price, shares_outstanding)
+
+
+@evaluator("ENTERPRISE_VALUE")
+def enterprise_value(equity_value, debt_value, preferred_equity, cash):
+    return np.add(equity_value, debt_value) + preferred_equity - cash
+
+
+@evaluator("INVENTORY_TURNOVER")
+def inventory_turnover(cogs, average_inventory):
+    return np.divide(cogs, average_inventory)
+
+
+@evaluator("AR_TURNOVER")
+def receivables_turnover(credit_sales, average_receivables):
+    return np.divide(credit_sales, average_receivables)
+
+
+@evaluator("AP_TURNOVER")
+def payables_turnover(credit_purchases, average_payables):
+    return np.divide(credit_purchases, average_payables)
+
+
+@evaluator("DAYS_IN_INVENTORY", "DAYS_IN_RECEIVABLES", "DAYS_IN_PAYABLES")
+def days_from_turnover(turnover, days_in_year=365):
+    return np.divide(days_in_year, turnover)
+
+
+@evaluator("CASH_FLOW_FROM_OPERATIONS")
+def cash_flow_from_operations(net_income, non_cash_charges, wc_decrease, wc_increase):
+    return np.add(net_income, non_cash_charges) + wc_decrease - wc_increase
+
+
+@evaluator("FREE_CASH_FLOW_FIRM")
+def free_cash_flow_firm(cfo, capital_expenditures):
+    return np.subtract(cfo, capital_expenditures)
+
+# -------------------------------------------------
+# CAPITAL BUDGETING & COST OF CAPITAL
+# -------------------------------------------------
+
+
+@evaluator("NPV")
+def net_present_value(cash_flows, rate, axis=-1):
+    """Σ CF_t / (1+r)^t with t = 0, 1, ... along axis; `rate` broadcasts."""
+    cf = np.moveaxis(np.asarray(cash_flows, dtype=float), axis, -1)
+    t = np.arange(cf.shape[-1], dtype=float)
+    rate = np.asarray(rate, dtype=float)[..., None]
+    return np.sum(cf * (1.0 + rate) ** -t, axis=-1)
+
+
+@evaluator("PROFITABILITY_INDEX")
+def profitability_index(pv_inflows, pv_outflows):
+    return np.divide(pv_inflows, pv_outflows)
+
+
+@evaluator("ROIC")
+def return_on_invested_capital(after_tax_operating_profit, average_invested_capital):
+    return np.divide(after_tax_operating_profit, average_invested_capital)
+
+
+@evaluator("PROJECT_NPV_WITH_OPTION")
+def npv_with_option(npv, option_value):
+    return np.add(npv, option_value)
+
+
+@evaluator("WACC")
+def wacc(wd, rd, t, we, re, wp=0.0, rp=0.0):
+    return np.multiply(wd, rd) * (1.0 - np.asarray(t)) + np.multiply(we, re) + np.multiply(wp, rp)
+
+
+@evaluator("COST_OF_DEBT")
+def after_tax_cost_of_debt(ytm, tax_rate):
+    return np.multiply(ytm, 1.0 - np.asarray(tax_rate))
+
+
+@evaluator("COST_OF_PREFERRED")
+def cost_of_preferred(preferred_dividend, preferred_price):
+    return np.divide(preferred_dividend, preferred_price)
+
+
+@evaluator("CAPM", "CAPM_EQUATION")
+def capm(rf, beta, rm):
+    return np.add(rf, np.multiply(beta, np.subtract(rm, rf)))
+
+# -------------------------------------------------
+# PORTFOLIO RISK & RETURN
+# -------------------------------------------------
+
+
+@evaluator("UTILITY_FUNCTION")
+def utility(expected_return, risk_aversion, sigma):
+    return expected_return - 0.5 * np.multiply(risk_aversion, np.square(sigma))
+
+
+@evaluator("EXPECTED_RETURN_PORTFOLIO")
+def portfolio_expected_return(weights, expected_returns, axis=-1):
+    return np.sum(np.multiply(weights, expected_returns), axis=axis)
+
+
+@evaluator("PORTFOLIO_VARIANCE_2_ASSETS")
+def portfolio_variance_2(w1, w2, sigma1, sigma2, cov12):
+    return (np.square(np.multiply(w1, sigma1)) + np.square(np.multiply(w2, sigma2))
+            + 2 * np.multiply(w1, w2) * cov12)
+
+
+@evaluator("COVARIANCE")
+def covariance(rho12, sigma1, sigma2):
+    return np.multiply(rho12, sigma1) * sigma2
+
+
+@evaluator("CORRELATION")
+def correlation(cov12, sigma1, sigma2):
+    return cov12 / np.multiply(sigma1, sigma2)
+
+
+@evaluator("PORTFOLIO_SD_2_ASSETS")
+def portfolio_sd_2(w1, w2, sigma1, sigma2, rho12):
+    return np.sqrt(portfolio_variance_2(w1, w2, sigma1, sigma2, covariance(rho12, sigma1, sigma2)))
+
+
+@evaluator("SYSTEMATIC_RISK")
+def systematic_variance(beta, sigma_market):
+    return np.square(np.multiply(beta, sigma_market))
+
+
+@evaluator("UNSYSTEMATIC_RISK")
+def unsystematic_variance(total_variance, systematic_variance):
+    return np.subtract(total_variance, systematic_variance)
+
+
+@evaluator("CML_EQUATION")
+def capital_market_line(rf, sigma_p, sigma_m, rm):
+    return np.add(rf, np.divide(sigma_p, sigma_m) * np.subtract(rm, rf))
+
+
+@evaluator("SML_INTERPRETATION")
+def sml_mispricing(actual_return, rf, beta, rm):
+    """Actual minus CAPM return: > 0 undervalued, < 0 overvalued."""
+    return np.subtract(actual_return, capm(rf, beta, rm))
+
+
+@evaluator("SHARPE_RATIO")
+def sharpe_ratio(rp, rf, sigma_p):
+    return np.subtract(rp, rf) / sigma_p
+
+
+@evaluator("TREYNOR_RATIO")
+def treynor_ratio(rp, rf, beta_p):
+    return np.subtract(rp, rf) / beta_p
+
+
+@evaluator("JENSENS_ALPHA")
+def jensens_alpha(rp, rf, beta_p, rm):
+    return np.subtract(rp, capm(rf, beta_p, rm))
+
+
+@evaluator("M_SQUARED")
+def m_squared(rp, rf, sigma_p, sigma_market):
+    return np.add(rf, sharpe_ratio(rp, rf, sigma_p) * sigma_market)
+
+
+@evaluator("MULTIFACTOR_MODEL")
+def multifactor_return(rf, betas, factors, axis=-1):
+    return np.add(rf, np.sum(np.multiply(betas, factors), axis=axis))
+
+# -------------------------------------------------
+# FIXED INCOME
+# -------------------------------------------------
+
+
+@evaluator("DISCOUNT_RATE")
+def discount_rate(face_value, price, days, days_in_year=365):
+    return np.divide(days_in_year, days) * np.subtract(face_value, price) / face_value
+
+
+@evaluator("ADD_ON_RATE")
+def add_on_rate(face_value, price, days, days_in_year=365):
+    return np.divide(days_in_year, days) * np.subtract(face_value, price) / price
+
+
+@evaluator("PRESENT_VALUE_SPOT")
+def present_value_spot(cash_flows, spot_rates, axis=-1):
+    """Σ CF_t / (1+z_t)^t with t = 1, 2, ... along axis."""
+    t = _periods(cash_flows, axis)
+    return np.sum(np.asarray(cash_flows, dtype=float) / (1.0 + np.asarray(spot_rates)) ** t, axis=axis)
+
+
+@evaluator("Z_SPREAD")
+def z_spread(cash_flows, spot_rates, price, axis=-1):
+    """Constant s with Σ CF_t / (1+z_t+s)^t = price; see cfa_trainer.spreads."""
+    cf = np.moveaxis(np.asarray(cash_flows, dtype=float), axis, -1)
+    z = np.moveaxis(np.asarray(spot_rates, dtype=float), axis, -1)
+    shape = np.broadcast_shapes(cf.shape[:-1], z.shape[:-1], np.shape(price))
+    rows = int(np.prod(shape))
+    result = solve_z_spread(
+        np.broadcast_to(cf, shape + cf.shape[-1:]).reshape(rows, -1),
+        np.broadcast_to(price, shape).reshape(rows),
+        np.broadcast_to(z, shape + z.shape[-1:]).reshape(rows, -1),
+    )
+    return result.spread.reshape(shape)
+
+
+@evaluator("FORWARD_RATE_2Y_1Y")
+def forward_rate_2y_1y(z1, z2):
+    return np.square(1.0 + np.asarray(z2)) / (1.0 + np.asarray(z1)) - 1.0
+
+
+@evaluator("YIELD_SPREAD")
+def yield_spread(ytm, benchmark_ytm):
+    return np.subtract(ytm, benchmark_ytm)
+
+
+@evaluator("YTM_COMPONENTS")
+def nominal_yield(real_rf, inflation, credit, liquidity, tax):
+    return np.add(real_rf, inflation) + credit + liquidity + tax
+
+
+@evaluator("REAL_RATE")
+def real_rate(nominal_rate, expected_inflation):
+    return np.subtract(nominal_rate, expected_inflation)
+
+
+@evaluator("MACAULAY_DURATION")
+def macaulay_duration(cash_flows, ytm, axis=-1):
+    """Σ t·PV(CF_t) / price, t = 1, 2, ... periods along axis."""
+    cf = np.asarray(cash_flows, dtype=float)
+    t = _periods(cf, axis)
+    pv = cf / (1.0 + np.expand_dims(np.asarray(ytm, dtype=float), axis)) ** t
+    return np.sum(t * pv, axis=axis) / np.sum(pv, axis=axis)
+
+
+@evaluator("MODIFIED_DURATION")
+def modified_duration(macaulay_duration, ytm, periods_per_year=1):
+    return macaulay_duration / (1.0 + np.divide(ytm, periods_per_year))
+
+
+@evaluator("EFFECTIVE_DURATION")
+def effective_duration(v_minus, v_plus, v0, delta_y):
+    return np.subtract(v_minus, v_plus) / (2.0 * np.multiply(v0, delta_y))
+
+
+@evaluator("MONEY_DURATION")
+def money_duration(modified_duration, full_price):
+    return np.multiply(modified_duration, full_price)
+
+
+@evaluator("PRICE_VALUE_BP")
+def price_value_of_basis_point(money_duration):
+    return np.divide(money_duration, 10_000)
+
+
+@evaluator("FRN_DURATION")
+def frn_duration(time_to_reset):
+    return np.asarray(time_to_reset, dtype=float)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Mock exams: a full paper built in one step and graded in one pass.
+
+An Exam stores bank positions in NumPy arrays: one question per item and
+an (items, OPTION_COUNT) matrix of options. Answers come back as an array
+of chosen positions (-1 = blank), so grading the whole submission, and
+the per-section breakdown, is a handful of vectorized operations.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from .deck import Deck
+from .distractors import options
+from .quiz import OPTION_COUNT
+
+EXAM_SIZES = (90, 180)
+SECONDS_PER_ITEM = 90  # 135 minutes per 90-item session
+BLANK = -1
+
+# -------------------------------------------------
+# PAPER
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Exam:
+    seed: int
+    questions: np.ndarray  # (items,) bank positions
+    options: np.ndarray    # (items, OPTION_COUNT) bank positions
+    seconds: int           # time allowed for the whole paper
+
+    def __len__(self):
+        return len(self.questions)
+
+
+def build_exam(bank, items=90, seed=None, difficulty="hard"):
+    """Draw a full paper from a shuffled deck (reshuffling past one pass)."""
+    deck = Deck.shuffled(len(bank), seed=seed)
+    questions = np.empty(items, dtype=np.int32)
+    choices = np.empty((items, OPTION_COUNT), dtype=np.int32)
+
+    for item in range(items):
+        question = bank.ids[deck.draw()]
+        offered = options(bank, question, OPTION_COUNT, deck.rng(), difficulty)
+        questions[item] = bank.index[question]
+        choices[item] = [bank.index[formula_id] for formula_id in offered]
+
+    questions.flags.writeable = False
+    choices.flags.writeable = False
+    return Exam(seed=deck.seed, questions=questions, options=choices,
+                seconds=items * SECONDS_PER_ITEM)
+
+
+def blank_answers(exam):
+    return np.full(len(exam), BLANK, dtype=np.int32)
+
+# -------------------------------------------------
+# GRADING
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class ExamResult:
+    correct: np.ndarray   # (items,) bool
+    answered: np.ndarray  # (items,) bool
+    sections: tuple       # section names, in bank order
+    section_correct: np.ndarray
+    section_items: np.ndarray
+
+    @property
+    def score(self):
+        return int(self.correct.sum())
+
+    @property
+    def percent(self):
+        return 100.0 * self.score / len(self.correct) if len(self.correct) else 0.0
+
+
+@lru_cache(maxsize=None)
+def section_codes(bank):
+    """Bank position -> index into the bank's section list."""
+    codes = np.empty(len(bank), dtype=np.int32)
+    for code, positions in enumerate(bank.sections.values()):
+        codes[list(positions)] = code
+    codes.flags.writeable = False
+    return codes
+
+
+def grade_exam(bank, exam, answers):
+    answers = np.asarray(answers, dtype=np.int32)
+    if answers.shape != exam.questions.shape:
+        raise ValueError(f"Expected {len(exam)} answers, got {answers.shape[0]}")
+
+    correct = answers == exam.questions
+    codes = section_codes(bank)[exam.questions]
+    n_sections = len(bank.sections)
+    return ExamResult(
+        correct=correct,
+        answered=answers != BLANK,
+        sections=tuple(bank.sections),
+        section_correct=np.bincount(codes, weights=correct, minlength=n_sections).astype(int),
+        section_items=np.bincount(codes, minlength=n_sections),
+    )
@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+"""
+Parser and compiler for the bank's `formula` strings.
+
+parse() reads the textbook notation used in formulas.json: Unicode
+operators (−, ×, ·, ², √, Σ), sub/superscripts, multi-word variable names
+("Closing Price"), implicit multiplication ("2w₁w₂", "βₚ(E(Rm) − Rf)"),
+E(·) and "a₁ ... aₙ" series written with an ellipsis. The result is a
+small AST with named variables, which compile_expr() turns once into a
+NumPy callable taking those variables as keyword arguments.
+
+A hyphen between two words is guessed to be part of a name in the bank's
+own strings ("Non-cash", "After-Tax"). Typed answers pass the hyphenated
+words the bank actually uses instead, and every other "-" is a minus.
+
+Series (Σ terms and ellipsis chains) become reductions over the last axis
+of their variables: "(1+R1)...(1+Rn)" is a product over an array R, and a
+bare t inside Σ is the period number 1, 2, ..., n.
+
+Strings that state a concept or an implicit equation rather than an
+expression ("Option-Adjusted Spread", "Σ CF_t / (1+IRR)^t = 0") parse as
+descriptive; they carry a reason and no callable.
+"""
+
+import keyword
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+# -------------------------------------------------
+# AST
+# -------------------------------------------------
+
+
+class Num(NamedTuple):
+    value: float
+
+
+class Var(NamedTuple):
+    name: str
+
+
+class Index(NamedTuple):
+    """Period number t = 1, 2, ..., n inside a series."""
+
+
+class Seq(NamedTuple):
+    """Series variable: an array along the last axis (R1 ... Rn, wi, CFt)."""
+    name: str
+
+
+class Neg(NamedTuple):
+    operand: tuple
+
+
+class BinOp(NamedTuple):
+    op: str  # + - * / ^
+    left: tuple
+    right: tuple
+
+
+class Call(NamedTuple):
+    func: str  # sqrt
+    arg: tuple
+
+
+class Reduce(NamedTuple):
+    op: str  # sum, prod
+    body: tuple
+
+
+class ParseError(ValueError):
+    pass
+
+# -------------------------------------------------
+# TOKENIZER
+# -------------------------------------------------
+
+REPLACEMENTS = (
+    ("−", "-"), ("–", "-"), ("×", "*"), ("·", "*"), ("÷", "/"),
+    ("[", "("), ("]", ")"), ("{", "("), ("}", ")"),
+    ("²", "^2"), ("³", "^3"), ("ᵗ", "^t"), ("ⁿ", "^n"),
+    ("₋", "minus"), ("₊", "plus"), ("…", "..."), ("**", "^"),
+)
+SUBSCRIPTS = str.maketrans("₀₁₂₃₄₅₆₇₈₉ᵢₚₜₙ", "0123456789iptn")
+FUNCTIONS = {"√": "sqrt", "sqrt": "sqrt"}
+
+TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>\d+(?:,\d{3})+(?![\d,])|\d*\.\d+|\d+)
+  | (?P<ellipsis>\.\.\.)
+  | (?P<sigma>Σ)
+  | (?P<sqrt>√)
+  | (?P<op>[-+*/^(),])
+  | (?P<word>[^\W\d][\w']*(?:-[^\W\d][\w']*)*)
+""", re.VERBOSE)
+
+MATH_NAME = re.compile(r"\d+(?:\.\d+)?|[^\W\d_][^\W\d_A-ZΑ-Ω]*(?:_[^\W_]+)?\d*")
+GREEK = re.compile(r"[α-ωΑ-Ω]")
+
+
+def normalize(text):
+    for old, new in REPLACEMENTS:
+        text = text.replace(old, new)
+    # σ²_market -> σ_market^2
+    text = re.sub(r"(\w)\^2_(\w+)", r"\1_\2^2", text.translate(SUBSCRIPTS))
+    return text
+
+
+def tokenize(text, hyphenated=None):
+    """Token list; `hyphenated` (lower-case words) overrides the hyphen heuristic."""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if match is None:
+            raise ParseError(f"Unexpected character {text[pos]!r} in {text!r}")
+        kind, value = match.lastgroup, match.group()
+        pos = match.end()
+        if kind == "space":
+            tokens.append(("space", " "))
+        elif kind == "number":
+            tokens.append(("number", _number(value.replace(",", ""))))
+        elif kind == "word":
+            for part in _split_hyphens(value, hyphenated):
+                tokens.extend(_split_word(part) if part != "-" else [("op", "-")])
+        else:
+            tokens.append((kind, value))
+    return tokens
+
+
+def _number(text):
+    value = float(text)
+    if not math.isfinite(value):
+        raise ParseError(f"Number {text[:12]}... is too large")
+    return value
+
+
+def _split_hyphens(word, hyphenated=None):
+    parts = word.split("-")
+    if hyphenated is not None:
+        # Typed answers: only hyphenated words the bank uses stay whole.
+        if word.lower() in hyphenated:
+            return [word]
+        return [parts[0], *(piece for part in parts[1:] for piece in ("-", part))]
+    # "Non-cash", "After-Tax" and "Z-spread" are words; "Rm-Rf" is a subtraction.
+    out = [parts[0]]
+    for part in parts[1:]:
+        prose = part.islower() or (len(out[-1]) >= 3 and len(part) >= 3 and part[1:].islower())
+        if prose and out[-1] != "-":
+            out[-1] = f"{out[-1]}-{part}"
+        else:
+            out.extend(["-", part])
+    return out
+
+
+def _split_word(word):
+    # "w1w2Cov" and "β1F1" are several math symbols written together;
+    # plain words ("Price", "MacDur", "EBIT") are kept whole.
+    if word in FUNCTIONS or not (re.search(r"\d", word) or GREEK.search(word)):
+        return [("word", word)]
+    parts = MATH_NAME.findall(word)
+    if "".join(parts) != word:
+        return [("word", word)]
+    return [("number", _number(p)) if p[0].isdigit() else ("symbol", p) for p in parts]
+
+# -------------------------------------------------
+# PARSER
+# -------------------------------------------------
+
+_ELLIPSIS = ("ellipsis",)
+SYMBOL_WORD = re.compile(r"[A-Za-z][a-z]?")  # Rf, Wd, wi, T
+STOP_WORDS = {"of", "in", "to", "on", "at", "by", "as", "or", "vs"}
+
+
+class _Parser:
+    """Recursive descent over the token list; spaces only glue names."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, skip_space=True):
+        pos = self.pos
+        while skip_space and pos < len(self.tokens) and self.tokens[pos][0] == "space":
+            pos += 1
+        return self.tokens[pos] if pos < len(self.tokens) else ("end", None)
+
+    def take(self):
+        while self.tokens[self.pos][0] == "space":
+            self.pos += 1
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        token = self.take() if self.peek()[0] != "end" else ("end", None)
+        if token[1] != value:
+            raise ParseError(f"Expected {value!r}, found {token[1]!r}")
+
+    def parse(self):
+        node = self.expression()
+        if self.peek()[0] != "end":
+            raise ParseError(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    # expression := term (("+" | "-") term)*
+    def expression(self):
+        terms = [(1, self.term())]
+        while self.peek()[1] in ("+", "-"):
+            sign = 1 if self.take()[1] == "+" else -1
+            terms.append((sign, self.term()))
+        return _fold_sum(_expand_series(terms, "sum"))
+
+    # term := factor (("*" | "/")? factor)*   -- juxtaposition multiplies
+    def term(self):
+        factors = [("*", self.unary())]
+        while True:
+            kind, value = self.peek()
+            if value in ("*", "/"):
+                self.take()
+                factors.append((value, self.unary()))
+            elif kind in ("number", "symbol", "word", "sigma", "sqrt", "ellipsis") or value == "(":
+                factors.append(("*", self.unary()))
+            else:
+                break
+        return _fold_product(_expand_series(factors, "prod"))
+
+    def unary(self):
+        kind, value = self.peek()
+        if value == "-":
+            self.take()
+            return Neg(self.unary())
+        if kind == "sigma":
+            self.take()
+            return Reduce("sum", _index_series(self.term()))
+        return self.power()
+
+    def power(self):
+        base = self.atom()
+        if self.peek()[1] == "^":
+            self.take()
+            return BinOp("^", base, self.unary())
+        return base
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == "number":
+            return Num(value)
+        if kind == "ellipsis":
+            return _ELLIPSIS
+        if kind == "sqrt" or (kind == "word" and value in FUNCTIONS):
+            return Call("sqrt", self.atom())
+        if value == "(":
+            node = self.expression()
+            self.expect(")")
+            return node
+        if kind == "symbol":
+            return self.name_suffix(value)
+        if kind == "word":
+            # Multi-word names: "Market Value of Equity", but "Wd Rd" is a product.
+            words = [value]
+            while (
+                self.peek(skip_space=False)[0] == "space"
+                and self.peek()[0] == "word"
+                and not (_symbol_like(words[-1]) and _symbol_like(self.peek()[1]))
+            ):
+                words.append(self.take()[1])
+            return self.name_suffix(" ".join(words))
+        raise ParseError(f"Unexpected {value!r}")
+
+    def name_suffix(self, name):
+        # E(x) is the expected value of x; Cov(1,2), PV(CFt) or
+        # "NPV (without option)" are names with a plain-text argument.
+        # Anything else followed by "(" is an implicit multiplication.
+        if self.peek()[1] != "(":
+            return Var(name)
+        if name == "E":
+            self.take()
+            node = self.expression()
+            self.expect(")")
+            return node
+        text = self._group_text()
+        if text and not re.search(r"[-+*/^]", text):
+            while self.take()[1] != ")":
+                pass
+            return Var(f"{name}({text})")
+        return Var(name)
+
+    def _group_text(self):
+        """Raw text of the parenthesized group ahead, if it is flat."""
+        pos = self.pos
+        while pos < len(self.tokens) and self.tokens[pos][0] == "space":
+            pos += 1
+        if pos >= len(self.tokens) or self.tokens[pos][1] != "(":
+            return ""
+        parts = []
+        for kind, value in self.tokens[pos + 1:]:
+            if value == ")":
+                return "".join(parts).strip()
+            if value == "(":
+                return None
+            parts.append(f"{value:g}" if kind == "number" else str(value))
+        return None
+
+
+def _symbol_like(word):
+    return SYMBOL_WORD.fullmatch(word) is not None and word not in STOP_WORDS
+
+
+def _fold_sum(terms):
+    sign, node = terms[0]
+    node = node if sign > 0 else Neg(node)
+    for sign, term in terms[1:]:
+        node = BinOp("+" if sign > 0 else "-", node, term)
+    return node
+
+
+def _fold_product(factors):
+    node = factors[0][1]
+    for op, factor in factors[1:]:
+        node = BinOp(op, node, factor)
+    return node
+
+# -------------------------------------------------
+# SERIES
+# -------------------------------------------------
+
+INDEXED = re.compile(r"^(.*?[^\d_])_?(\d+|n)$")
+
+
+def _expand_series(items, op):
+    """Turn  a1 ∘ a2 ∘ ... ∘ an  inside a chain into Reduce(op, a)."""
+    nodes = [node for _, node in items]
+    marks = [i for i, node in enumerate(nodes) if node is _ELLIPSIS]
+    if not marks or len(nodes) == 1:
+        return items
+    e = marks[0]
+    if e == 0 or e == len(nodes) - 1 or len(marks) > 1:
+        raise ParseError("Ellipsis must sit between two terms of a series")
+
+    start = e - 1
+    while start > 0 and _indexed_vars(nodes[start - 1]):
+        start -= 1
+    template = nodes[start]
+    if not any(INDEXED.match(v).group(2) == "1" for v in _indexed_vars(template)):
+        raise ParseError("Series must start at index 1")
+
+    reduced = Reduce(op, _rename(template, _series_name_1))
+    first = items[start][0]
+    return items[:start] + [(first, reduced)] + items[e + 2:]
+
+
+def _indexed_vars(node):
+    return [v for v in variables(node) if INDEXED.match(v)]
+
+
+def _series_name_1(name):
+    match = INDEXED.match(name)
+    return Seq(match.group(1)) if match and match.group(2) == "1" else Var(name)
+
+
+def _index_series(node):
+    # Inside Σ, names subscripted with i or t are series (wi, Ri, CF_t, zt)
+    # and a bare t is the period number.
+    def base(name):
+        call = re.match(r"^(\w+)\((.*)\)$", name)
+        if call:
+            inner = base(call.group(2))
+            return inner and f"{call.group(1)}({inner})"
+        match = re.match(r"^(.*?[^\W_])_?([it])$", name)
+        return match.group(1) if match and len(match.group(1)) <= 2 else None
+
+    def rename(name):
+        if name == "t":
+            return Index()
+        series = base(name)
+        return Seq(series) if series else Var(name)
+    return _rename(node, rename)
+
+
+def _rename(node, rename):
+    if isinstance(node, Var):
+        return rename(node.name)
+    if isinstance(node, (Num, Index, Seq, Reduce)):
+        return node
+    return type(node)(*(
+        _rename(child, rename) if isinstance(child, tuple) else child for child in node
+    ))
+
+# -------------------------------------------------
+# INSPECTION
+# -------------------------------------------------
+
+
+def variables(node):
+    """Variable names in order of first appearance."""
+    found = []
+
+    def walk(n):
+        if isinstance(n, (Var, Seq)):
+            if n.name not in found:
+                found.append(n.name)
+        elif isinstance(n, tuple) and not isinstance(n, (Num, Index)):
+            for child in n:
+                if isinstance(child, tuple):
+                    walk(child)
+    walk(node)
+    return found
+
+
+def series_variables(node):
+    found = []
+
+    def walk(n):
+        if isinstance(n, Seq):
+            if n.name not in found:
+                found.append(n.name)
+        elif isinstance(n, tuple) and not isinstance(n, (Num, Index, Var)):
+            for child in n:
+                if isinstance(child, tuple):
+                    walk(child)
+    walk(node)
+    return found
+
+
+def identifier(name):
+    """Python keyword-argument name for a variable: "Closing Price" -> closing_price."""
+    ident = re.sub(r"\W+", "_", name.lower()).strip("_")
+    if not ident or ident[0].isdigit():
+        ident = f"v_{ident}"
+    return f"{ident}_" if keyword.iskeyword(ident) else ident
+
+# -------------------------------------------------
+# PARSE & COMPILE
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Expression:
+    source: str
+    ast: tuple = None
+    variables: tuple = ()   # display names, in order of appearance
+    arguments: tuple = ()   # matching keyword-argument names
+    series: tuple = ()      # arguments that are arrays along the last axis
+    reason: str = ""        # why the formula is descriptive
+
+    @property
+    def descriptive(self):
+        return self.ast is None
+
+
+def parse(text, hyphenated=None):
+    """Parse a formula string; descriptive strings come back without an AST.
+
+    `hyphenated` is the set of lower-case hyphenated words to keep whole;
+    given it, any other "-" is a minus (see tokenize()).
+    """
+    body = normalize(text)
+    body = re.split(r":|\bsuch that\b", body)[-1]
+    if "=" in body:
+        lhs, rhs = body.split("=", 1)
+        if rhs.strip() == "0":
+            return Expression(text, reason="implicit equation (solved numerically)")
+        if len(lhs.split()) > 2:
+            return Expression(text, reason="statement, not an expression")
+        body = rhs
+
+    try:
+        ast = _Parser(tokenize(body, hyphenated)).parse()
+    except ParseError as exc:
+        return Expression(text, reason=f"not algebraic: {exc}")
+    except IndexError:
+        return Expression(text, reason="not algebraic: incomplete expression")
+    except RecursionError:
+        return Expression(text, reason="not algebraic: nested too deeply")
+
+    if isinstance(ast, Var):
+        return Expression(text, reason="names a concept, not a calculation")
+
+    names = variables(ast)
+    idents = [identifier(name) for name in names]
+    series = {identifier(name) for name in series_variables(ast)}
+    return Expression(
+        text,
+        ast=ast,
+        variables=tuple(names),
+        arguments=tuple(idents),
+        series=tuple(i for i in idents if i in series),
+    )
+
+
+def to_source(node, series=(), inside=False):
+    """NumPy source for an AST node."""
+    if isinstance(node, Num):
+        return repr(node.value)
+    if isinstance(node, Seq):
+        return identifier(node.name)
+    if isinstance(node, Var):
+        ident = identifier(node.name)
+        return f"_col({ident})" if inside else ident
+    if isinstance(node, Index):
+        return f"_periods({series[0]})" if series else "1.0"
+    if isinstance(node, Neg):
+        return f"(-{to_source(node.operand, series, inside)})"
+    if isinstance(node, BinOp):
+        op = "**" if node.op == "^" else node.op
+        left = to_source(node.left, series, inside)
+        right = to_source(node.right, series, inside)
+        return f"({left} {op} {right})"
+    if isinstance(node, Call):
+        return f"_np.{node.func}({to_source(node.arg, series, inside)})"
+    if isinstance(node, Reduce):
+        return f"_np.{node.op}({to_source(node.body, series, True)}, axis=-1)"
+    raise TypeError(f"Unknown node {node!r}")
+
+
+def _col(x):
+    return np.expand_dims(np.asarray(x, dtype=float), -1)
+
+
+def _periods(x):
+    return np.arange(1, np.shape(x)[-1] + 1, dtype=float)
+
+
+def compile_expr(expression):
+    """Build a callable f(**arguments) for a parsed, non-descriptive formula."""
+    if expression.descriptive:
+        raise ValueError(f"{expression.source!r} is descriptive: {expression.reason}")
+    # With series present, n defaults to their length: GEOM_MEAN(r=[...]).
+    counted = bool(expression.series) and "n" in expression.arguments
+    args = ", ".join(f"{a}=None" if counted and a == "n" else a for a in expression.arguments)
+    body = to_source(expression.ast, expression.series)
+    prologue = "".join(f"    {a} = _np.asarray({a}, dtype=float)\n" for a in expression.series)
+    if counted:
+        prologue += f"    n = _np.shape({expression.series[0]})[-1] if n is None else n\n"
+    namespace = {"_np": np, "_col": _col, "_periods": _periods}
+    code = f"def formula(*, {args}):\n{prologue}    return {body}\n"
+    exec(code, namespace)
+    func = namespace["formula"]
+    func.__doc__ = expression.source
+    return func
+
+
+@lru_cache(maxsize=None)
+def compiled(bank, formula_id):
+    """(Expression, callable or None) for a bank entry, built once per id."""
+    expression = parse(bank[formula_id].formula)
+    return expression, None if expression.descriptive else compile_expr(expression)
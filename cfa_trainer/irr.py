@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Batch IRR / money-weighted return solver.
+
+solve_irr() takes a 2-D array, one cash-flow series per row (t = 0, 1, ...;
+shorter series are padded with zeros), and solves every row at once:
+
+1. Vectorized Newton steps from a common guess, on the rows still active.
+2. Rows that diverge, leave (-1, MAX_RATE] or stall fall back to a scan of
+   NPV over a rate grid and vectorized bisection inside the sign change
+   nearest the guess.
+3. Rows that may have several IRRs (the IRR trap) are scanned too, and
+   the number of sign changes of NPV on the grid is reported as `roots`;
+   `multiple` flags rows with more than one IRR. A row is known to have at
+   most one IRR when its cash flows change sign once (Descartes) or its
+   cumulative cash flows do (Norstrom), so most accounts skip the scan.
+
+NPV is a polynomial in x = 1 / (1 + r), evaluated by Horner's rule across
+all rows, so the only Python loops are over periods and iterations.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+GUESS = 0.1
+TOL = 1e-10
+NEWTON_STEPS = 50
+BISECTION_STEPS = 200
+MIN_RATE, MAX_RATE = -0.99, 10.0
+GRID = np.expm1(np.linspace(np.log1p(MIN_RATE), np.log1p(MAX_RATE), 257))
+SCAN_CHUNK = 4096  # rows scanned at a time, bounding the (rows, GRID) matrix
+
+# -------------------------------------------------
+# NPV
+# -------------------------------------------------
+
+
+def npv(cash_flows, rate):
+    """NPV of each row at `rate` (broadcast against the leading axes), and dNPV/dr."""
+    cf = np.asarray(cash_flows, dtype=float)
+    x = 1.0 / (1.0 + np.asarray(rate, dtype=float))
+    value = np.zeros(np.broadcast_shapes(cf.shape[:-1], x.shape))
+    slope = np.zeros_like(value)
+    for t in range(cf.shape[-1] - 1, -1, -1):
+        slope = slope * x + value
+        value = value * x + cf[..., t]
+    return value, -slope * x * x
+
+
+def sign_changes(cash_flows):
+    """Sign changes along each row, zeros skipped (Descartes' bound on the IRR count)."""
+    signs = np.sign(np.asarray(cash_flows, dtype=float))
+    # Carry the last non-zero sign forward over zeros.
+    index = np.where(signs != 0, np.arange(signs.shape[-1]), 0)
+    np.maximum.accumulate(index, axis=-1, out=index)
+    carried = np.take_along_axis(signs, index, axis=-1)
+    return np.sum((carried[..., 1:] * carried[..., :-1]) < 0, axis=-1)
+
+
+def irr_bound(cash_flows):
+    """Upper bound on the number of IRRs of each row."""
+    cf = np.asarray(cash_flows, dtype=float)
+    cumulative = np.cumsum(cf, axis=-1)
+    unique = (sign_changes(cumulative) == 1) & (cumulative[..., -1] != 0)
+    return np.where(unique, np.minimum(sign_changes(cf), 1), sign_changes(cf))
+
+# -------------------------------------------------
+# SOLVER
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class IRRResult:
+    rate: np.ndarray          # (rows,), NaN where no IRR was found
+    converged: np.ndarray     # (rows,) bool
+    sign_changes: np.ndarray  # (rows,) sign changes of the cash flows
+    roots: np.ndarray         # (rows,) IRRs found in (MIN_RATE, MAX_RATE]
+
+    @property
+    def multiple(self):
+        return self.roots > 1
+
+    def __len__(self):
+        return len(self.rate)
+
+
+def solve_irr(cash_flows, guess=GUESS, tol=TOL, iterations=NEWTON_STEPS):
+    """Solve Σ CF_t / (1+r)^t = 0 for every row of a 2-D cash-flow array."""
+    cf = np.asarray(cash_flows, dtype=float)
+    if cf.ndim != 2:
+        raise ValueError(f"Expected a 2-D (accounts, periods) array, got shape {cf.shape}")
+    rows = cf.shape[0]
+    changes = sign_changes(cf)
+    bound = irr_bound(cf)
+
+    rate = np.full(rows, np.nan)
+    converged = np.zeros(rows, dtype=bool)
+    roots = np.zeros(rows, dtype=np.int64)
+
+    # Newton on the rows that can have an IRR, compressing the active set.
+    active = np.flatnonzero(changes > 0)
+    current = np.full(active.size, float(guess))
+    with np.errstate(all="ignore"):
+        for _ in range(iterations):
+            if not active.size:
+                break
+            value, slope = npv(cf[active], current)
+            step = value / slope
+            current = current - step
+            done = np.abs(step) <= tol * (1.0 + np.abs(current))
+            bad = ~np.isfinite(current) | (current <= MIN_RATE) | (current > MAX_RATE)
+            finished = done & ~bad
+            rate[active[finished]] = current[finished]
+            converged[active[finished]] = True
+            keep = ~(done | bad)
+            active, current = active[keep], current[keep]
+
+    # Scan failures and every non-conventional row; bisect where Newton failed.
+    scan = np.flatnonzero((bound > 1) | ((changes > 0) & ~converged))
+    for start in range(0, scan.size, SCAN_CHUNK):
+        chunk = scan[start:start + SCAN_CHUNK]
+        found, lo, hi = _scan(cf[chunk], guess)
+        roots[chunk] = found
+        retry = ~converged[chunk] & np.isfinite(lo)
+        if retry.any():
+            rate[chunk[retry]] = _bisect(cf[chunk[retry]], lo[retry], hi[retry], tol)
+            converged[chunk[retry]] = True
+
+    # Newton can land on a tangent root the grid misses.
+    roots = np.where(converged & (roots == 0), 1, roots)
+    roots[(bound == 1) & converged] = 1
+    return IRRResult(rate=rate, converged=converged, sign_changes=changes, roots=roots)
+
+
+def _scan(cf, guess):
+    """Roots counted on GRID, and per row the bracket nearest the guess (NaN if none)."""
+    with np.errstate(all="ignore"):
+        value, _ = npv(cf[:, None, :], GRID[None, :])
+    signs = np.sign(value)
+    crossing = (signs[:, :-1] * signs[:, 1:]) < 0
+    exact = signs[:, 1:-1] == 0
+    found = crossing.sum(axis=1) + exact.sum(axis=1)
+
+    # Bracket whose midpoint is closest to the guess, among the crossings.
+    middle = 0.5 * (GRID[:-1] + GRID[1:])
+    distance = np.where(crossing, np.abs(middle - guess), np.inf)
+    nearest = np.argmin(distance, axis=1)
+    bracketed = crossing.any(axis=1)
+    return (
+        found,
+        np.where(bracketed, GRID[nearest], np.nan),
+        np.where(bracketed, GRID[nearest + 1], np.nan),
+    )
+
+
+def _bisect(cf, lo, hi, tol):
+    f_lo, _ = npv(cf, lo)
+    for _ in range(BISECTION_STEPS):
+        mid = 0.5 * (lo + hi)
+        f_mid, _ = npv(cf, mid)
+        left = np.sign(f_mid) == np.sign(f_lo)
+        lo = np.where(left, mid, lo)
+        f_lo = np.where(left, f_mid, f_lo)
+        hi = np.where(left, hi, mid)
+        if np.all(hi - lo <= tol * (1.0 + np.abs(lo))):
+            break
+    return 0.5 * (lo + hi)
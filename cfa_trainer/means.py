@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+One-pass, mergeable means for return series that do not fit in memory.
+
+MeanAccumulator tracks, per series (column), the running means behind
+ARITH_MEAN, GEOM_MEAN, HARM_MEAN and MULTI_HPR:
+
+- arithmetic: mean of r
+- geometric:  expm1(mean of log1p(r)) -- compounding in log space, so
+  decades of daily returns neither overflow nor underflow
+- harmonic:   1 / mean(1 / x), as HARM_MEAN and evaluate.harmonic_mean --
+  over the raw values, so it is meant for series of prices or multiples
+  (cost averaging), not for returns near zero
+- compound:   expm1(sum of log1p(r))
+
+Each chunk is reduced with NumPy's pairwise sums and folded in as a
+weighted update of the running means (Chan et al.), which is also how
+two accumulators merge, so partial results from worker processes combine
+into the same answer up to rounding. NaNs are missing observations.
+
+RollingMeans gives the same statistics over a trailing window, chunk by
+chunk, keeping only the last window - 1 rows between chunks.
+"""
+
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+
+CHUNK_ROWS = 65_536
+
+
+class Means(NamedTuple):
+    count: np.ndarray
+    arithmetic: np.ndarray
+    geometric: np.ndarray
+    harmonic: np.ndarray
+    compound: np.ndarray
+
+
+def _columns(returns):
+    r = np.asarray(returns, dtype=float)
+    return r[:, None] if r.ndim == 1 else r
+
+# -------------------------------------------------
+# ACCUMULATOR
+# -------------------------------------------------
+
+
+@dataclass(slots=True)
+class MeanAccumulator:
+    count: np.ndarray
+    mean: np.ndarray        # mean of r
+    mean_log: np.ndarray    # mean of log1p(r)
+    mean_recip: np.ndarray  # mean of 1 / x
+
+    @classmethod
+    def empty(cls, columns=1):
+        return cls(
+            count=np.zeros(columns, dtype=np.int64),
+            mean=np.zeros(columns),
+            mean_log=np.zeros(columns),
+            mean_recip=np.zeros(columns),
+        )
+
+    @classmethod
+    def from_returns(cls, returns):
+        """Accumulator for one in-memory chunk, (rows,) or (rows, columns)."""
+        r = _columns(returns)
+        valid = ~np.isnan(r)
+        count = valid.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = np.maximum(count, 1)
+            return cls(
+                count=count,
+                mean=np.where(valid, r, 0.0).sum(axis=0) / n,
+                mean_log=np.log1p(np.where(valid, r, 0.0)).sum(axis=0) / n,
+                mean_recip=np.where(valid, 1.0 / r, 0.0).sum(axis=0) / n,
+            )
+
+    def update(self, returns):
+        """Fold in a chunk of returns (rows along axis 0)."""
+        self.merge(MeanAccumulator.from_returns(returns))
+        return self
+
+    def merge(self, other):
+        """Combine another accumulator over the same columns into this one."""
+        total = self.count + other.count
+        weight = np.divide(other.count, total, out=np.zeros(len(total)), where=total > 0)
+        self.mean = self.mean + (other.mean - self.mean) * weight
+        self.mean_log = self.mean_log + (other.mean_log - self.mean_log) * weight
+        self.mean_recip = self.mean_recip + (other.mean_recip - self.mean_recip) * weight
+        self.count = total
+        return self
+
+    def means(self):
+        empty = self.count == 0
+        # compound may overflow to inf on very long series; log_growth will not.
+        with np.errstate(divide="ignore", over="ignore"):
+            return Means(
+                count=self.count,
+                arithmetic=np.where(empty, np.nan, self.mean),
+                geometric=np.where(empty, np.nan, np.expm1(self.mean_log)),
+                harmonic=np.where(empty, np.nan, 1.0 / self.mean_recip),
+                compound=np.expm1(self.count * self.mean_log),
+            )
+
+    @property
+    def log_growth(self):
+        """Sum of log1p(r): the compound return in log space, never overflows."""
+        return self.count * self.mean_log
+
+# -------------------------------------------------
+# ROLLING WINDOWS
+# -------------------------------------------------
+
+
+class RollingMeans:
+    """Trailing-window means, fed chunk by chunk; memory is window × columns."""
+
+    def __init__(self, window, columns=1):
+        if window < 1:
+            raise ValueError(f"Window must be at least 1, got {window}")
+        self.window = window
+        self._carry = np.empty((0, columns))
+
+    def update(self, returns):
+        """Means for every window that ends inside this chunk."""
+        r = np.vstack([self._carry, _columns(returns)])
+        self._carry = r[-(self.window - 1):] if self.window > 1 else r[:0]
+
+        valid = ~np.isnan(r)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            count = _window_sum(valid.astype(float), self.window)
+            mean_log = _window_sum(np.log1p(np.where(valid, r, 0.0)), self.window) / count
+            return Means(
+                count=count.astype(np.int64),
+                arithmetic=_window_sum(np.where(valid, r, 0.0), self.window) / count,
+                geometric=np.expm1(mean_log),
+                harmonic=count / _window_sum(np.where(valid, 1.0 / r, 0.0), self.window),
+                compound=np.expm1(mean_log * count),
+            )
+
+
+def _window_sum(values, window):
+    # Cumulative sums restart with every chunk, so rounding never builds up
+    # across a long series.
+    c = np.cumsum(values, axis=0)
+    c = np.vstack([np.zeros((1, values.shape[1])), c])
+    return c[window:] - c[:-window]
+
+# -------------------------------------------------
+# STREAMS
+# -------------------------------------------------
+
+
+def read_returns(path, chunk_rows=CHUNK_ROWS):
+    """Chunks of a returns file: .npy (memory-mapped) or CSV (numeric columns)."""
+    if str(path).lower().endswith(".csv"):
+        import pandas as pd
+
+        for frame in pd.read_csv(path, chunksize=chunk_rows):
+            yield frame.select_dtypes("number").to_numpy(dtype=float)
+    else:
+        returns = np.load(path, mmap_mode="r")
+        for start in range(0, len(returns), chunk_rows):
+            yield returns[start:start + chunk_rows]
+
+
+def accumulate(chunks):
+    """MeanAccumulator over a stream of chunks."""
+    accumulator = None
+    for chunk in chunks:
+        part = MeanAccumulator.from_returns(chunk)
+        accumulator = part if accumulator is None else accumulator.merge(part)
+    return accumulator if accumulator is not None else MeanAccumulator.empty()
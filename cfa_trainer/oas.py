@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Callable and putable bonds on a binomial interest-rate tree: value,
+option-adjusted spread (OAS) and effective duration.
+
+The tree is the CFA lognormal one: at period t the one-period rates are
+r(t, k) = r(t, 0)·exp(2σk), k = 0..t up-moves, each branch with
+probability 1/2. calibrate() fits r(t, 0) level by level so that the tree
+reprices every zero-coupon bond on the spot curve (forward induction with
+state prices); trees are cached by curve and volatility.
+
+value() runs backward induction for a whole portfolio at once: each step
+is one array operation over (bonds, states), and the issuer calls (holder
+puts) wherever the continuation value is above the call price (below the
+put price). oas() solves value(s) = price by Newton steps over all bonds
+together, and effective_duration() reprices at the OAS on trees
+calibrated to the curve shifted down and up, with the shifted valuations
+of large portfolios spread over a shared process pool:
+
+    duration = (V₋ − V₊) / (2·V₀·Δy)
+
+Rates, coupons and the volatility are per period; exercise happens on
+coupon dates, after the coupon is paid.
+"""
+
+import atexit
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+CALIBRATION_STEPS = 50
+TOL = 1e-10
+OAS_STEPS = 50
+BUMP = 1e-6        # spread step for the numeric dV/ds in oas()
+DELTA_Y = 0.0025   # curve shift for effective duration
+CHUNK_BONDS = 2048  # bonds per process-pool task
+PARALLEL_BONDS = 4 * CHUNK_BONDS  # smaller portfolios are valued in-process
+
+# -------------------------------------------------
+# TREE
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class RateTree:
+    rates: np.ndarray  # (periods, periods): rates[t, k] for k <= t, NaN above
+    volatility: float
+
+    @property
+    def periods(self):
+        return len(self.rates)
+
+
+def calibrate(spot_rates, volatility):
+    """Tree that reprices the zero-coupon bonds of the curve (cached, read-only)."""
+    z = np.ascontiguousarray(spot_rates, dtype=float)
+    if z.ndim != 1:
+        raise ValueError(f"Expected one spot curve, got shape {z.shape}")
+    if volatility < 0:
+        raise ValueError(f"Volatility must be non-negative, got {volatility}")
+    return _calibrate(z.tobytes(), float(volatility))
+
+
+@lru_cache(maxsize=64)
+def _calibrate(data, volatility):
+    z = np.frombuffer(data)
+    n = len(z)
+    discount = (1.0 + z) ** -np.arange(1, n + 1)
+    rates = np.full((n, n), np.nan)
+    prices = np.ones(1)  # state prices at level t
+    for t in range(n):
+        spacing = np.exp(2.0 * volatility * np.arange(t + 1))
+        # Newton on the lowest rate, from the forward rate.
+        low = (discount[t - 1] if t else 1.0) / discount[t] - 1.0
+        low /= np.dot(prices, spacing) / prices.sum()
+        for _ in range(CALIBRATION_STEPS):
+            growth = 1.0 + low * spacing
+            error = np.dot(prices, 1.0 / growth) - discount[t]
+            step = error / -np.dot(prices, spacing / growth**2)
+            low -= step
+            if abs(step) <= TOL * (1.0 + abs(low)):
+                break
+        rates[t, :t + 1] = low * spacing
+        half = 0.5 * prices / (1.0 + rates[t, :t + 1])
+        prices = np.append(half, 0.0) + np.insert(half, 0, 0.0)
+    rates.flags.writeable = False
+    return RateTree(rates=rates, volatility=volatility)
+
+# -------------------------------------------------
+# BONDS
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class OptionBond:
+    coupon: float           # rate per period
+    maturity: int           # periods
+    face: float = 100.0
+    call_price: float = math.nan  # NaN: not callable
+    call_from: int = 1      # first period the call can be exercised
+    put_price: float = math.nan   # NaN: not putable
+    put_from: int = 1
+
+    def __post_init__(self):
+        if self.maturity < 1:
+            raise ValueError(f"Maturity must be at least one period, got {self.maturity}")
+
+
+@dataclass(frozen=True, slots=True)
+class Portfolio:
+    """Per-period cash flows and exercise prices of many bonds, shape (bonds, periods + 1)."""
+    flows: np.ndarray
+    call: np.ndarray  # +inf where the bond is not callable
+    put: np.ndarray   # -inf where the bond is not putable
+
+    @classmethod
+    def from_bonds(cls, bonds):
+        return _portfolio(tuple(bonds))
+
+    @property
+    def periods(self):
+        return self.flows.shape[1] - 1
+
+    def __len__(self):
+        return len(self.flows)
+
+    def __getitem__(self, index):
+        return Portfolio(self.flows[index], self.call[index], self.put[index])
+
+
+@lru_cache(maxsize=16)
+def _portfolio(bonds):
+    coupon, maturity, face, call_price, call_from, put_price, put_from = (
+        np.array(column, dtype=float) for column in zip(*(
+            (b.coupon, b.maturity, b.face, b.call_price, b.call_from, b.put_price, b.put_from)
+            for b in bonds
+        ))
+    )
+    t = np.arange(int(maturity.max()) + 1)[None, :]
+    maturity = maturity[:, None]
+    live = t <= maturity
+    flows = np.where(live & (t > 0), (coupon * face)[:, None], 0.0) + np.where(t == maturity, face[:, None], 0.0)
+    # Exercise on coupon dates strictly before maturity; never at t = 0.
+    window = (t > 0) & (t < maturity)
+    call = np.where(window & (t >= call_from[:, None]) & ~np.isnan(call_price)[:, None], call_price[:, None], np.inf)
+    put = np.where(window & (t >= put_from[:, None]) & ~np.isnan(put_price)[:, None], put_price[:, None], -np.inf)
+    for values in (flows, call, put):
+        values.flags.writeable = False
+    return Portfolio(flows=flows, call=call, put=put)
+
+# -------------------------------------------------
+# VALUATION
+# -------------------------------------------------
+
+
+def value(portfolio, tree, spread=0.0):
+    """Value of each bond at time 0 with `spread` added to every tree rate."""
+    if portfolio.periods > tree.periods:
+        raise ValueError(f"Bonds run {portfolio.periods} periods, the tree only {tree.periods}")
+    spread = np.broadcast_to(np.asarray(spread, dtype=float), (len(portfolio),))[:, None]
+    flows, call, put = portfolio.flows, portfolio.call, portfolio.put
+    v = np.zeros((len(portfolio), portfolio.periods + 1))  # ex-coupon values at maturity
+    for t in range(portfolio.periods - 1, -1, -1):
+        # Value at t of the coupon at t + 1 plus whatever the bond is worth then.
+        ahead = v + flows[:, t + 1, None]
+        v = 0.5 * (ahead[:, :-1] + ahead[:, 1:]) / (1.0 + tree.rates[t, :t + 1] + spread)
+        v = np.maximum(np.minimum(v, call[:, t, None]), put[:, t, None])
+    return v[:, 0]
+
+
+@dataclass(frozen=True, slots=True)
+class OASResult:
+    oas: np.ndarray        # (bonds,), NaN where Newton did not converge
+    converged: np.ndarray  # (bonds,) bool
+
+    def __len__(self):
+        return len(self.oas)
+
+
+def oas(portfolio, tree, prices, guess=0.0, tol=TOL, iterations=OAS_STEPS):
+    """Constant spread over the tree rates that reproduces each bond's price."""
+    price = np.broadcast_to(np.asarray(prices, dtype=float), (len(portfolio),))
+    spread = np.full(len(portfolio), np.nan)
+    converged = np.zeros(len(portfolio), dtype=bool)
+    active = np.flatnonzero(price > 0)
+    current = np.full(active.size, float(guess))
+    floor = -1.0 - np.nanmin(tree.rates) + 1e-9
+    with np.errstate(all="ignore"):
+        for _ in range(iterations):
+            if not active.size:
+                break
+            part = portfolio[active]
+            v = value(part, tree, current)
+            slope = (value(part, tree, current + BUMP) - v) / BUMP
+            step = (v - price[active]) / slope
+            current = np.where(current - step > floor, current - step, 0.5 * (current + floor))
+            done = np.abs(step) <= tol * (1.0 + np.abs(current))
+            bad = ~np.isfinite(current) | (slope >= 0)
+            finished = done & ~bad
+            spread[active[finished]] = current[finished]
+            converged[active[finished]] = True
+            keep = ~(done | bad)
+            active, current = active[keep], current[keep]
+    return OASResult(oas=spread, converged=converged)
+
+# -------------------------------------------------
+# EFFECTIVE DURATION
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class DurationResult:
+    v0: np.ndarray
+    v_minus: np.ndarray  # curve shifted down by delta_y
+    v_plus: np.ndarray   # curve shifted up by delta_y
+    effective_duration: np.ndarray
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """Process-wide pool, kept between calls so its workers' tree caches survive."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is None:
+                atexit.register(_shutdown_pool)
+            else:
+                _pool.shutdown()
+            _pool, _pool_workers = ProcessPoolExecutor(max_workers=workers), workers
+        return _pool
+
+
+def _shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def _shifted_value(portfolio, spot_rates, volatility, spread):
+    return value(portfolio, calibrate(spot_rates, volatility), spread)
+
+
+def effective_duration(portfolio, spot_rates, volatility, spread, delta_y=DELTA_Y, workers=None):
+    """(V₋ − V₊) / (2·V₀·Δy), holding each bond's spread (its OAS) constant.
+
+    Portfolios of PARALLEL_BONDS bonds or more have their down- and
+    up-shifted valuations split into CHUNK_BONDS tasks on the shared pool of
+    `workers` processes (os.cpu_count() by default); smaller ones, or one
+    worker, run in this process.
+    """
+    z = np.asarray(spot_rates, dtype=float)
+    spread = np.broadcast_to(np.asarray(spread, dtype=float), (len(portfolio),))
+    v0 = value(portfolio, calibrate(z, volatility), spread)
+    workers = workers or os.cpu_count() or 1
+
+    chunks = [slice(start, start + CHUNK_BONDS) for start in range(0, len(portfolio), CHUNK_BONDS)]
+    tasks = [(portfolio[c], z + shift, volatility, spread[c]) for shift in (-delta_y, delta_y) for c in chunks]
+    if workers > 1 and len(portfolio) >= PARALLEL_BONDS:
+        values = list(get_pool(workers).map(_shifted_value, *zip(*tasks)))
+    else:
+        values = [_shifted_value(*task) for task in tasks]
+    v_minus = np.concatenate(values[:len(chunks)])
+    v_plus = np.concatenate(values[len(chunks):])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        duration = (v_minus - v_plus) / (2.0 * v0 * delta_y)
+    return DurationResult(v0=v0, v_minus=v_minus, v_plus=v_plus, effective_duration=duration)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+N-asset portfolio risk for many portfolios at once.
+
+The two-asset formulas (PORTFOLIO_VARIANCE_2_ASSETS, PORTFOLIO_SD_2_ASSETS)
+generalise to σ²_p = w·Σ·wᵀ. With a (portfolios, assets) weight matrix W,
+one product W·Σ gives every portfolio's covariance with every asset, and
+from it:
+
+- variance:  Σ_i w_i (WΣ)_i            per portfolio
+- volatility: √variance
+- marginal:  ∂σ_p/∂w_i = (WΣ)_i / σ_p   per portfolio and asset
+- component: w_i · marginal_i, summing to σ_p (Euler decomposition)
+
+Large screens are processed CHUNK_PORTFOLIOS rows at a time, so memory
+stays bounded while each block is still one BLAS product.
+
+covariance_from_correlation() and correlation_from_covariance() scale
+rows and columns in place (COVARIANCE: ρ·σ₁·σ₂, CORRELATION: cov/(σ₁σ₂)),
+writing into `out` when given so an n × n matrix is not copied twice.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+CHUNK_PORTFOLIOS = 1024
+
+# -------------------------------------------------
+# CORRELATION <-> COVARIANCE
+# -------------------------------------------------
+
+
+def covariance_from_correlation(correlation, volatilities, out=None):
+    """Σ = D·R·D with D = diag(σ); `out` may be `correlation` itself."""
+    sigma = np.asarray(volatilities, dtype=float)
+    out = np.multiply(correlation, sigma[:, None], out=out)
+    out *= sigma[None, :]
+    return out
+
+
+def correlation_from_covariance(covariance, out=None):
+    """(R, σ) from Σ; `out` may be `covariance` itself."""
+    cov = np.asarray(covariance, dtype=float)
+    sigma = np.sqrt(np.diagonal(cov)).copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = 1.0 / sigma
+    out = np.multiply(cov, scale[:, None], out=out)
+    out *= scale[None, :]
+    np.fill_diagonal(out, np.where(sigma > 0, 1.0, np.nan))
+    return out, sigma
+
+# -------------------------------------------------
+# RISK
+# -------------------------------------------------
+
+
+class PortfolioRisk(NamedTuple):
+    variance: np.ndarray    # (portfolios,)
+    volatility: np.ndarray  # (portfolios,)
+    marginal: np.ndarray    # (portfolios, assets) ∂σ_p/∂w
+    component: np.ndarray   # (portfolios, assets) w·∂σ_p/∂w, rows sum to σ_p
+
+
+def _inputs(weights, covariance):
+    w = np.asarray(weights, dtype=float)
+    w = w[None, :] if w.ndim == 1 else w
+    cov = np.asarray(covariance, dtype=float)
+    if cov.shape != (w.shape[1], w.shape[1]):
+        raise ValueError(f"Covariance shape {cov.shape} does not match {w.shape[1]} assets")
+    return w, cov
+
+
+def portfolio_variance(weights, covariance):
+    """w·Σ·wᵀ for each row of a (portfolios, assets) weight matrix."""
+    w, cov = _inputs(weights, covariance)
+    variance = np.empty(len(w))
+    for start in range(0, len(w), CHUNK_PORTFOLIOS):
+        block = w[start:start + CHUNK_PORTFOLIOS]
+        variance[start:start + CHUNK_PORTFOLIOS] = np.einsum("pi,pi->p", block @ cov, block)
+    return variance
+
+
+def portfolio_risk(weights, covariance):
+    """Variance, volatility, marginal and component risk of every portfolio."""
+    w, cov = _inputs(weights, covariance)
+    variance = np.empty(len(w))
+    marginal = np.empty(w.shape)
+    for start in range(0, len(w), CHUNK_PORTFOLIOS):
+        rows = slice(start, start + CHUNK_PORTFOLIOS)
+        exposure = np.matmul(w[rows], cov, out=marginal[rows])
+        variance[rows] = np.einsum("pi,pi->p", exposure, w[rows])
+    volatility = np.sqrt(np.maximum(variance, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marginal /= volatility[:, None]
+    return PortfolioRisk(
+        variance=variance,
+        volatility=volatility,
+        marginal=marginal,
+        component=w * marginal,
+    )
@@ -0,0 +1,824 @@
+# -*- coding: utf-8 -*-
+"""
+Numeric practice problems generated from per-formula templates.
+
+A Template draws realistic random inputs for one formula id, phrases them
+as a problem ("Opening price 40, closing 44, dividend 1 — compute the
+HPR.") and scores them with the evaluator from cfa_trainer.evaluate. Its
+traps turn the mistake described in the bank's `trap` into wrong answers
+computed from the same inputs, which become the distractors.
+
+Problems are generated in vectorized batches. A ProblemPool keeps a queue
+of ready problems per topic (bank section) and a background thread refills
+a topic when it runs low, so serving the next problem never waits.
+"""
+
+import inspect
+import logging
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from .evaluate import EVALUATORS, compound_return, geometric_mean, holding_period_return
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 32
+LOW_WATER = 8
+MIN_OPTIONS = 3
+REDRAWS = 10  # attempts to redraw inputs whose traps coincide with the answer
+SLIP = "A calculation slip"
+SLIPS = (1.1, 0.9, 1.25, 0.8, 1.5, 0.5)  # multiples of the answer used as fallback options
+
+PERCENT = "{:.2%}"
+RATIO = "{:.2f}"
+SMALL = "{:.4f}"
+MONEY = "{:,.2f}"
+DAYS = "{:.1f} days"
+YEARS = "{:.2f} years"
+
+# -------------------------------------------------
+# TEMPLATES
+# -------------------------------------------------
+
+
+class Draw(NamedTuple):
+    """Uniform input on [low, high], rounded to `step`; `length` > 0 for a series."""
+    low: float
+    high: float
+    step: float
+    percent: bool = False
+    length: int = 0
+
+
+class Derive(NamedTuple):
+    """Input computed from the inputs drawn before it."""
+    func: Callable
+    percent: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class Template:
+    formula_id: str
+    prompt: str     # str.format over the inputs
+    inputs: dict    # name -> Draw or Derive, in drawing order
+    traps: Callable  # (**inputs) -> {mistake: wrong answers}
+    answer_format: str
+
+
+TEMPLATES = {}
+
+
+def template(formula_id, prompt, answer_format=PERCENT, **inputs):
+    def register(traps):
+        if formula_id not in EVALUATORS:
+            raise ValueError(f"No evaluator for {formula_id}")
+        if formula_id in TEMPLATES:
+            raise ValueError(f"Duplicate template for {formula_id}")
+        TEMPLATES[formula_id] = Template(formula_id, prompt, inputs, traps, answer_format)
+        return traps
+    return register
+
+
+def _pair(first, second):
+    return lambda v: np.stack([v[first], second(v)], axis=-1)
+
+
+@template("HPR", "Opening price {opening_price}, closing price {closing_price}, dividend "
+          "{income} — compute the holding period return.",
+          opening_price=Draw(20, 120, 0.5), change=Draw(-0.2, 0.3, 0.01),
+          closing_price=Derive(lambda v: np.round(v["opening_price"] * (1 + v["change"]) * 2) / 2),
+          income=Draw(0.5, 5, 0.25))
+def _(opening_price, change, closing_price, income):
+    return {
+        "Leaving out the income": holding_period_return(opening_price, closing_price),
+        "Dividing by the closing price": (closing_price - opening_price + income) / closing_price,
+    }
+
+
+@template("MULTI_HPR", "Annual returns of {returns} — compute the compound return over the period.",
+          returns=Draw(-0.1, 0.2, 0.005, percent=True, length=3))
+def _(returns):
+    return {
+        "Adding the returns instead of compounding": returns.sum(axis=-1),
+        "Using the arithmetic mean": returns.mean(axis=-1),
+    }
+
+
+@template("ARITH_MEAN", "Annual returns of {returns} — compute the arithmetic mean return.",
+          returns=Draw(-0.1, 0.25, 0.005, percent=True, length=4))
+def _(returns):
+    return {
+        "Using the geometric mean": geometric_mean(returns),
+        "Dividing by n − 1": returns.sum(axis=-1) / (returns.shape[-1] - 1),
+    }
+
+
+@template("GEOM_MEAN", "Annual returns of {returns} — compute the geometric mean return.",
+          returns=Draw(-0.15, 0.25, 0.005, percent=True, length=4))
+def _(returns):
+    return {
+        "Using the arithmetic mean": returns.mean(axis=-1),
+        "Compounding without taking the n-th root": compound_return(returns),
+    }
+
+
+@template("HARM_MEAN", "Equal amounts are invested at share prices of {values} — compute the "
+          "average cost per share.", answer_format=MONEY,
+          values=Draw(10, 60, 1, length=3))
+def _(values):
+    return {
+        "Using the arithmetic mean of the prices": values.mean(axis=-1),
+        "Using the geometric mean of the prices": np.exp(np.log(values).mean(axis=-1)),
+    }
+
+# SOLVENCY, LIQUIDITY & PROFITABILITY
+
+
+@template("DEBT_TO_EQUITY", "Total debt {total_debt}, total equity {total_equity} — compute the "
+          "debt-to-equity ratio.", answer_format=RATIO,
+          total_debt=Draw(100, 900, 10), total_equity=Draw(200, 1200, 10))
+def _(total_debt, total_equity):
+    return {
+        "Dividing by debt plus equity": total_debt / (total_debt + total_equity),
+        "Inverting the ratio": total_equity / total_debt,
+    }
+
+
+@template("DEBT_TO_ASSETS", "Total debt {total_debt}, total assets {total_assets} — compute the "
+          "debt-to-assets ratio.", answer_format=RATIO,
+          total_debt=Draw(100, 600, 10), total_assets=Draw(800, 2000, 10))
+def _(total_debt, total_assets):
+    return {
+        "Confusing it with debt-to-equity": total_debt / (total_assets - total_debt),
+        "Inverting the ratio": total_assets / total_debt,
+    }
+
+
+@template("DEBT_TO_CAPITAL", "Debt {debt}, equity {equity}, other liabilities {other} — compute "
+          "the debt-to-capital ratio.", answer_format=RATIO,
+          debt=Draw(100, 800, 10), equity=Draw(200, 1200, 10), other=Draw(50, 400, 10))
+def _(debt, equity, other):
+    return {
+        "Using total assets instead of capital": debt / (debt + equity + other),
+        "Using debt-to-equity": debt / equity,
+    }
+
+
+@template("FINANCIAL_LEVERAGE", "Average total assets {average_assets}, average equity "
+          "{average_equity} — compute the financial leverage ratio.", answer_format=RATIO,
+          average_assets=Draw(1000, 5000, 50), average_equity=Draw(300, 900, 10))
+def _(average_assets, average_equity):
+    return {
+        "Inverting the ratio": average_equity / average_assets,
+        "Using liabilities over equity": (average_assets - average_equity) / average_equity,
+    }
+
+
+@template("INTEREST_COVERAGE", "EBIT {ebit}, interest expense {interest_expense}, tax rate "
+          "{tax_rate} — compute the interest coverage ratio.", answer_format=RATIO,
+          ebit=Draw(200, 900, 10), interest_expense=Draw(20, 150, 5),
+          tax_rate=Draw(0.2, 0.35, 0.01, percent=True))
+def _(ebit, interest_expense, tax_rate):
+    net_income = (ebit - interest_expense) * (1 - tax_rate)
+    return {
+        "Using net income instead of EBIT": net_income / interest_expense,
+        "Inverting the ratio": interest_expense / ebit,
+    }
+
+
+@template("CURRENT_RATIO", "Current assets {current_assets}, current liabilities "
+          "{current_liabilities} — compute the current ratio.", answer_format=RATIO,
+          current_assets=Draw(200, 900, 10), current_liabilities=Draw(150, 600, 10))
+def _(current_assets, current_liabilities):
+    return {"Inverting the ratio": current_liabilities / current_assets}
+
+
+@template("CASH_RATIO", "Cash {cash}, marketable securities {marketable_securities}, receivables "
+          "{receivables}, current liabilities {current_liabilities} — compute the cash ratio.",
+          answer_format=RATIO,
+          cash=Draw(20, 150, 5), marketable_securities=Draw(10, 100, 5),
+          receivables=Draw(50, 200, 5), current_liabilities=Draw(150, 500, 10))
+def _(cash, marketable_securities, receivables, current_liabilities):
+    return {
+        "Including receivables": (cash + marketable_securities + receivables) / current_liabilities,
+        "Leaving out marketable securities": cash / current_liabilities,
+    }
+
+
+@template("QUICK_RATIO", "Cash {cash}, marketable securities {marketable_securities}, receivables "
+          "{accounts_receivable}, inventory {inventory}, current liabilities {current_liabilities} "
+          "— compute the quick ratio.", answer_format=RATIO,
+          cash=Draw(20, 150, 5), marketable_securities=Draw(10, 100, 5),
+          accounts_receivable=Draw(50, 200, 5), inventory=Draw(50, 300, 5),
+          current_liabilities=Draw(150, 500, 10))
+def _(cash, marketable_securities, accounts_receivable, inventory, current_liabilities):
+    liquid = cash + marketable_securities
+    return {
+        "Confusing it with the cash ratio": liquid / current_liabilities,
+        "Including inventory": (liquid + accounts_receivable + inventory) / current_liabilities,
+    }
+
+
+@template("DEFENSIVE_INTERVAL", "Cash {cash}, marketable securities {marketable_securities}, "
+          "receivables {accounts_receivable}, average daily expenses {daily_expenses}, current "
+          "liabilities {current_liabilities} — compute the defensive interval.", answer_format=DAYS,
+          cash=Draw(20, 150, 5), marketable_securities=Draw(10, 100, 5),
+          accounts_receivable=Draw(50, 200, 5), daily_expenses=Draw(2, 10, 0.5),
+          current_liabilities=Draw(150, 500, 10))
+def _(cash, marketable_securities, accounts_receivable, daily_expenses, current_liabilities):
+    liquid = cash + marketable_securities + accounts_receivable
+    return {
+        "Using current liabilities instead of daily expenses": liquid / current_liabilities,
+        "Leaving out receivables": (cash + marketable_securities) / daily_expenses,
+    }
+
+
+@template("CASH_CONVERSION_CYCLE", "Days of inventory {days_inventory}, days of sales outstanding "
+          "{days_receivables}, days of payables {days_payables} — compute the cash conversion "
+          "cycle.", answer_format=DAYS,
+          days_inventory=Draw(20, 90, 1), days_receivables=Draw(20, 70, 1),
+          days_payables=Draw(15, 60, 1))
+def _(days_inventory, days_receivables, days_payables):
+    return {
+        "Adding days payables instead of subtracting":
+            days_inventory + days_receivables + days_payables,
+        "Subtracting days of sales outstanding": days_inventory - days_receivables + days_payables,
+    }
+
+
+@template("NET_PROFIT_MARGIN", "Sales {sales}, EBIT {ebit}, net income {net_income} — compute the "
+          "net profit margin.",
+          sales=Draw(500, 1500, 10), ebit=Draw(90, 200, 1), net_income=Draw(20, 80, 1))
+def _(sales, ebit, net_income):
+    return {"Using EBIT instead of net income": ebit / sales}
+
+
+@template("GROSS_PROFIT_MARGIN", "Sales {sales}, gross profit {gross_profit}, EBIT {ebit} — "
+          "compute the gross profit margin.",
+          sales=Draw(800, 1500, 10), gross_profit=Draw(300, 600, 5), ebit=Draw(90, 200, 1))
+def _(sales, gross_profit, ebit):
+    return {"Confusing it with the operating margin": ebit / sales}
+
+
+@template("OPERATING_MARGIN", "Sales {sales}, EBIT {ebit}, net income {net_income} — compute the "
+          "operating margin.",
+          sales=Draw(500, 1500, 10), ebit=Draw(90, 200, 1), net_income=Draw(20, 80, 1))
+def _(sales, ebit, net_income):
+    return {"Using net income instead of EBIT": net_income / sales}
+
+
+@template("PRETAX_MARGIN", "Sales {sales}, EBIT {ebit}, earnings before tax "
+          "{earnings_before_tax} — compute the pretax margin.",
+          sales=Draw(500, 1500, 10), ebit=Draw(100, 200, 1), earnings_before_tax=Draw(50, 90, 1))
+def _(sales, ebit, earnings_before_tax):
+    return {"Confusing it with the operating margin": ebit / sales}
+
+# FIRM VALUE, WORKING CAPITAL & CASH FLOW
+
+
+@template("MARKET_CAP", "Share price {share_price}, book value per share {book_value}, "
+          "{shares_outstanding} shares outstanding — compute the market capitalization.",
+          answer_format=MONEY,
+          share_price=Draw(10, 80, 0.5), book_value=Draw(5, 40, 0.5),
+          shares_outstanding=Draw(1_000, 50_000, 1_000))
+def _(share_price, book_value, shares_outstanding):
+    return {"Using book value instead of market value": book_value * shares_outstanding}
+
+
+@template("ENTERPRISE_VALUE", "Market value of equity {equity_value}, of debt {debt_value}, "
+          "preferred equity {preferred_equity}, cash {cash} — compute the enterprise value.",
+          answer_format=MONEY,
+          equity_value=Draw(500, 3000, 50), debt_value=Draw(200, 1500, 50),
+          preferred_equity=Draw(0, 200, 10), cash=Draw(50, 400, 10))
+def _(equity_value, debt_value, preferred_equity, cash):
+    return {
+        "Forgetting to subtract cash": equity_value + debt_value + preferred_equity,
+        "Adding cash": equity_value + debt_value + preferred_equity + cash,
+    }
+
+
+@template("INVENTORY_TURNOVER", "Sales {sales}, COGS {cogs}, average inventory "
+          "{average_inventory} — compute the inventory turnover.", answer_format=RATIO,
+          sales=Draw(1000, 2000, 10), cogs=Draw(500, 900, 10), average_inventory=Draw(80, 250, 5))
+def _(sales, cogs, average_inventory):
+    return {"Using sales instead of COGS": sales / average_inventory}
+
+
+@template("AR_TURNOVER", "Total sales {total_sales}, credit sales {credit_sales}, average "
+          "receivables {average_receivables} — compute the receivables turnover.",
+          answer_format=RATIO,
+          total_sales=Draw(1200, 2000, 10), credit_sales=Draw(600, 1100, 10),
+          average_receivables=Draw(80, 250, 5))
+def _(total_sales, credit_sales, average_receivables):
+    return {"Using total sales instead of credit sales": total_sales / average_receivables}
+
+
+@template("AP_TURNOVER", "COGS {cogs}, credit purchases {credit_purchases}, average payables "
+          "{average_payables} — compute the payables turnover.", answer_format=RATIO,
+          cogs=Draw(900, 1500, 10), credit_purchases=Draw(500, 850, 10),
+          average_payables=Draw(60, 200, 5))
+def _(cogs, credit_purchases, average_payables):
+    return {"Using COGS instead of purchases": cogs / average_payables}
+
+
+@template("DAYS_IN_INVENTORY", "Inventory turnover {turnover}, receivables turnover {other} — "
+          "compute days of inventory on hand.", answer_format=DAYS,
+          turnover=Draw(3, 12, 0.1), other=Draw(5, 15, 0.1))
+def _(turnover, other):
+    return {"Using receivables turnover instead": 365 / other}
+
+
+@template("CASH_FLOW_FROM_OPERATIONS", "Net income {net_income}, depreciation {non_cash_charges}, "
+          "decrease in receivables {wc_decrease}, increase in inventory {wc_increase}, new "
+          "borrowing {borrowing} — compute cash flow from operations.", answer_format=MONEY,
+          net_income=Draw(100, 500, 5), non_cash_charges=Draw(20, 120, 5),
+          wc_decrease=Draw(5, 60, 1), wc_increase=Draw(5, 60, 1), borrowing=Draw(50, 300, 10))
+def _(net_income, non_cash_charges, wc_decrease, wc_increase, borrowing):
+    cfo = net_income + non_cash_charges + wc_decrease - wc_increase
+    return {
+        "Including financing cash flows": cfo + borrowing,
+        "Adding the increase in working capital": cfo + 2 * wc_increase,
+    }
+
+
+@template("FREE_CASH_FLOW_FIRM", "Cash flow from operations {cfo}, capital expenditures "
+          "{capital_expenditures}, net borrowing {net_borrowing} — compute free cash flow.",
+          answer_format=MONEY,
+          cfo=Draw(200, 800, 10), capital_expenditures=Draw(50, 300, 10),
+          net_borrowing=Draw(20, 150, 5))
+def _(cfo, capital_expenditures, net_borrowing):
+    return {"Confusing it with FCFE": cfo - capital_expenditures + net_borrowing}
+
+# CAPITAL BUDGETING & COST OF CAPITAL
+
+
+@template("PROFITABILITY_INDEX", "PV of inflows {pv_inflows}, PV of outflows {pv_outflows} — "
+          "compute the profitability index.", answer_format=RATIO,
+          pv_inflows=Draw(800, 2000, 10), pv_outflows=Draw(600, 1500, 10))
+def _(pv_inflows, pv_outflows):
+    return {"Using NPV over the outlay": (pv_inflows - pv_outflows) / pv_outflows}
+
+
+@template("ROIC", "After-tax operating profit {after_tax_operating_profit}, net income "
+          "{net_income}, average invested capital {average_invested_capital} — compute ROIC.",
+          after_tax_operating_profit=Draw(100, 300, 5), net_income=Draw(50, 95, 1),
+          average_invested_capital=Draw(800, 2500, 50))
+def _(after_tax_operating_profit, net_income, average_invested_capital):
+    return {"Using net income instead of operating profit": net_income / average_invested_capital}
+
+
+@template("WACC", "Weights: debt {wd}, equity {we}. Pre-tax cost of debt {rd}, cost of equity "
+          "{re}, tax rate {t} — compute the WACC.",
+          wd=Draw(0.2, 0.6, 0.05, percent=True), we=Derive(lambda v: 1 - v["wd"], percent=True),
+          rd=Draw(0.03, 0.09, 0.0025, percent=True), re=Draw(0.08, 0.15, 0.0025, percent=True),
+          t=Draw(0.2, 0.35, 0.01, percent=True))
+def _(wd, we, rd, re, t):
+    return {
+        "Forgetting the tax shield on debt": wd * rd + we * re,
+        "Applying the tax rate to equity": (wd * rd + we * re) * (1 - t),
+    }
+
+
+@template("COST_OF_DEBT", "A bond with a {coupon} coupon yields {ytm}; tax rate {tax_rate} — "
+          "compute the after-tax cost of debt.",
+          coupon=Draw(0.03, 0.08, 0.0025, percent=True), ytm=Draw(0.04, 0.1, 0.0025, percent=True),
+          tax_rate=Draw(0.2, 0.35, 0.01, percent=True))
+def _(coupon, ytm, tax_rate):
+    return {
+        "Using the coupon rate instead of YTM": coupon * (1 - tax_rate),
+        "Forgetting the tax shield": ytm,
+    }
+
+
+@template("COST_OF_PREFERRED", "Preferred dividend {preferred_dividend}, par value {par}, market "
+          "price {preferred_price} — compute the cost of preferred stock.",
+          preferred_dividend=Draw(2, 8, 0.25), par=Draw(50, 100, 50),
+          preferred_price=Draw(40, 120, 0.5))
+def _(preferred_dividend, par, preferred_price):
+    return {"Using par value instead of market price": preferred_dividend / par}
+
+
+@template("CAPM", "Risk-free rate {rf}, beta {beta}, expected market return {rm} — compute the "
+          "required return.",
+          rf=Draw(0.01, 0.05, 0.0025, percent=True), beta=Draw(0.5, 1.8, 0.05),
+          rm=Draw(0.07, 0.12, 0.0025, percent=True))
+def _(rf, beta, rm):
+    return {
+        "Multiplying beta by the market return, not the premium": rf + beta * rm,
+        "Leaving out the risk-free rate": beta * (rm - rf),
+    }
+
+# PORTFOLIO RISK & RETURN
+
+
+@template("UTILITY_FUNCTION", "Expected return {expected_return}, standard deviation {sigma}, "
+          "risk aversion {risk_aversion} — compute the utility.",
+          expected_return=Draw(0.05, 0.15, 0.005, percent=True),
+          sigma=Draw(0.1, 0.3, 0.01, percent=True), risk_aversion=Draw(1, 6, 0.5))
+def _(expected_return, sigma, risk_aversion):
+    return {
+        "Using σ instead of σ²": expected_return - 0.5 * risk_aversion * sigma,
+        "Forgetting the ½": expected_return - risk_aversion * sigma ** 2,
+    }
+
+
+@template("EXPECTED_RETURN_PORTFOLIO", "Weights {weights} in two assets with expected returns "
+          "{expected_returns} — compute the portfolio's expected return.",
+          w1=Draw(0.1, 0.9, 0.05), weights=Derive(_pair("w1", lambda v: 1 - v["w1"]), percent=True),
+          expected_returns=Draw(0.02, 0.15, 0.005, percent=True, length=2))
+def _(w1, weights, expected_returns):
+    return {"Weighting the assets equally": expected_returns.mean(axis=-1)}
+
+
+@template("PORTFOLIO_VARIANCE_2_ASSETS", "Weights {w1} and {w2}, standard deviations {sigma1} and "
+          "{sigma2}, correlation {rho} — compute the portfolio variance.", answer_format=SMALL,
+          w1=Draw(0.1, 0.9, 0.05, percent=True), w2=Derive(lambda v: 1 - v["w1"], percent=True),
+          sigma1=Draw(0.1, 0.35, 0.01, percent=True), sigma2=Draw(0.1, 0.35, 0.01, percent=True),
+          rho=Draw(-0.5, 0.9, 0.05),
+          cov12=Derive(lambda v: v["rho"] * v["sigma1"] * v["sigma2"]))
+def _(w1, w2, sigma1, sigma2, rho, cov12):
+    return {
+        "Ignoring covariance": (w1 * sigma1) ** 2 + (w2 * sigma2) ** 2,
+        "Taking the square root": np.sqrt((w1 * sigma1) ** 2 + (w2 * sigma2) ** 2 + 2 * w1 * w2 * cov12),
+    }
+
+
+@template("COVARIANCE", "Correlation {rho12}, standard deviations {sigma1} and {sigma2} — compute "
+          "the covariance.", answer_format=SMALL,
+          rho12=Draw(-0.6, 0.9, 0.05), sigma1=Draw(0.1, 0.35, 0.01, percent=True),
+          sigma2=Draw(0.1, 0.35, 0.01, percent=True))
+def _(rho12, sigma1, sigma2):
+    return {
+        "Confusing covariance with correlation": rho12,
+        "Using variances instead of standard deviations": rho12 * sigma1 ** 2 * sigma2 ** 2,
+    }
+
+
+@template("CORRELATION", "Covariance {cov12}, standard deviations {sigma1} and {sigma2} — compute "
+          "the correlation.", answer_format=RATIO,
+          sigma1=Draw(0.1, 0.35, 0.01, percent=True), sigma2=Draw(0.1, 0.35, 0.01, percent=True),
+          rho=Draw(-0.5, 0.9, 0.05),
+          cov12=Derive(lambda v: np.round(v["rho"] * v["sigma1"] * v["sigma2"], 4)))
+def _(sigma1, sigma2, rho, cov12):
+    return {
+        "Dividing by the product of variances": cov12 / (sigma1 * sigma2) ** 2,
+        "Dividing by one standard deviation only": cov12 / sigma1,
+    }
+
+
+@template("PORTFOLIO_SD_2_ASSETS", "Weights {w1} and {w2}, standard deviations {sigma1} and "
+          "{sigma2}, correlation {rho12} — compute the portfolio standard deviation.",
+          w1=Draw(0.1, 0.9, 0.05, percent=True), w2=Derive(lambda v: 1 - v["w1"], percent=True),
+          sigma1=Draw(0.1, 0.35, 0.01, percent=True), sigma2=Draw(0.1, 0.35, 0.01, percent=True),
+          rho12=Draw(-0.5, 0.9, 0.05))
+def _(w1, w2, sigma1, sigma2, rho12):
+    variance = (w1 * sigma1) ** 2 + (w2 * sigma2) ** 2 + 2 * w1 * w2 * sigma1 * sigma2 * rho12
+    return {
+        "Omitting the square root": variance,
+        "Averaging the standard deviations": w1 * sigma1 + w2 * sigma2,
+    }
+
+
+@template("SYSTEMATIC_RISK", "Beta {beta}, market standard deviation {sigma_market} — compute the "
+          "systematic variance.", answer_format=SMALL,
+          beta=Draw(0.5, 1.8, 0.05), sigma_market=Draw(0.1, 0.25, 0.01, percent=True))
+def _(beta, sigma_market):
+    return {"Not squaring beta and σ": beta * sigma_market}
+
+
+@template("CML_EQUATION", "Risk-free rate {rf}, market return {rm}, market σ {sigma_m}; the "
+          "portfolio has σ {sigma_p} and beta {beta} — compute its expected return on the CML.",
+          rf=Draw(0.01, 0.05, 0.0025, percent=True), rm=Draw(0.07, 0.12, 0.0025, percent=True),
+          sigma_m=Draw(0.12, 0.22, 0.01, percent=True), sigma_p=Draw(0.05, 0.3, 0.01, percent=True),
+          beta=Draw(0.5, 1.5, 0.05))
+def _(rf, rm, sigma_m, sigma_p, beta):
+    return {"Using beta instead of σp / σm": rf + beta * (rm - rf)}
+
+# PERFORMANCE MEASURES
+
+
+@template("SHARPE_RATIO", "Portfolio return {rp}, risk-free rate {rf}, standard deviation "
+          "{sigma_p}, beta {beta_p} — compute the Sharpe ratio.", answer_format=RATIO,
+          rp=Draw(0.06, 0.15, 0.0025, percent=True), rf=Draw(0.01, 0.04, 0.0025, percent=True),
+          sigma_p=Draw(0.1, 0.3, 0.01, percent=True), beta_p=Draw(0.6, 1.5, 0.05))
+def _(rp, rf, sigma_p, beta_p):
+    return {
+        "Using beta instead of standard deviation": (rp - rf) / beta_p,
+        "Forgetting to subtract the risk-free rate": rp / sigma_p,
+    }
+
+
+@template("TREYNOR_RATIO", "Portfolio return {rp}, risk-free rate {rf}, standard deviation "
+          "{sigma_p}, beta {beta_p} — compute the Treynor ratio.", answer_format=SMALL,
+          rp=Draw(0.06, 0.15, 0.0025, percent=True), rf=Draw(0.01, 0.04, 0.0025, percent=True),
+          sigma_p=Draw(0.1, 0.3, 0.01, percent=True), beta_p=Draw(0.6, 1.5, 0.05))
+def _(rp, rf, sigma_p, beta_p):
+    return {"Using total risk instead of beta": (rp - rf) / sigma_p}
+
+
+@template("JENSENS_ALPHA", "Portfolio return {rp}, risk-free rate {rf}, beta {beta_p}, market "
+          "return {rm} — compute Jensen's alpha.",
+          rp=Draw(0.06, 0.15, 0.0025, percent=True), rf=Draw(0.01, 0.04, 0.0025, percent=True),
+          beta_p=Draw(0.6, 1.5, 0.05), rm=Draw(0.06, 0.12, 0.0025, percent=True))
+def _(rp, rf, beta_p, rm):
+    return {"Ignoring the beta adjustment": rp - rm}
+
+
+@template("MULTIFACTOR_MODEL", "Risk-free rate {rf}, factor sensitivities {betas}, factor "
+          "premiums {factors} — compute the expected return.",
+          rf=Draw(0.01, 0.04, 0.0025, percent=True), betas=Draw(0.2, 1.5, 0.05, length=2),
+          factors=Draw(0.01, 0.06, 0.0025, percent=True, length=2))
+def _(rf, betas, factors):
+    return {"Using only the first (market) factor": rf + betas[..., 0] * factors[..., 0]}
+
+# FIXED INCOME
+
+
+@template("DISCOUNT_RATE", "A {days}-day bill with face value {face_value} sells at {price} — "
+          "compute the discount rate.",
+          days=Draw(30, 180, 1), face_value=Draw(100, 100, 1), price=Draw(97, 99.75, 0.05))
+def _(days, face_value, price):
+    return {"Using price instead of face value in the denominator":
+            365 / days * (face_value - price) / price}
+
+
+@template("ADD_ON_RATE", "A {days}-day instrument with face value {face_value} costs {price} — "
+          "compute the add-on rate.",
+          days=Draw(30, 180, 1), face_value=Draw(100, 100, 1), price=Draw(97, 99.75, 0.05))
+def _(days, face_value, price):
+    return {"Confusing it with the discount rate": 365 / days * (face_value - price) / face_value}
+
+
+@template("PRESENT_VALUE_SPOT", "A 3-year bond pays an annual coupon of {coupon} on 100 face; spot "
+          "rates are {spot_rates} — compute its price.", answer_format=MONEY,
+          coupon=Draw(3, 8, 0.25), z1=Draw(0.01, 0.04, 0.0025),
+          slope=Draw(0.0025, 0.015, 0.0025, length=2),
+          # Upward-sloping, so the flat-rate trap stays visibly off the answer.
+          spot_rates=Derive(lambda v: v["z1"][..., None] + np.cumsum(np.pad(v["slope"], ((0, 0), (1, 0))), axis=-1),
+                            percent=True),
+          cash_flows=Derive(lambda v: v["coupon"][..., None] + [0, 0, 100]))
+def _(coupon, z1, slope, spot_rates, cash_flows):
+    flat = spot_rates[..., -1:]
+    return {"Discounting every cash flow at the 3-year rate":
+            np.sum(cash_flows / (1 + flat) ** np.arange(1, 4), axis=-1)}
+
+
+@template("FORWARD_RATE_2Y_1Y", "One-year spot rate {z1}, two-year spot rate {z2} — compute the "
+          "one-year rate one year forward.",
+          z1=Draw(0.01, 0.06, 0.0025, percent=True), z2=Draw(0.01, 0.06, 0.0025, percent=True))
+def _(z1, z2):
+    return {"Using the arithmetic relationship": 2 * z2 - z1}
+
+
+@template("REAL_RATE", "Nominal rate {nominal_rate}, expected inflation {expected_inflation}, "
+          "last year's inflation {actual_inflation} — compute the real rate.",
+          nominal_rate=Draw(0.03, 0.09, 0.0025, percent=True),
+          expected_inflation=Draw(0.01, 0.04, 0.0025, percent=True),
+          actual_inflation=Draw(0.01, 0.06, 0.0025, percent=True))
+def _(nominal_rate, expected_inflation, actual_inflation):
+    return {"Using actual instead of expected inflation": nominal_rate - actual_inflation}
+
+
+@template("MACAULAY_DURATION", "A 4-year annual-pay bond with a {coupon} coupon on 100 face "
+          "yields {ytm} — compute its Macaulay duration.", answer_format=YEARS,
+          coupon=Draw(0.02, 0.1, 0.0025, percent=True), ytm=Draw(0.02, 0.1, 0.0025, percent=True),
+          cash_flows=Derive(lambda v: 100 * v["coupon"][..., None] + [0, 0, 0, 100]))
+def _(coupon, ytm, cash_flows):
+    t = np.arange(1, 5)
+    return {"Weighting by undiscounted cash flows":
+            np.sum(t * cash_flows, axis=-1) / np.sum(cash_flows, axis=-1)}
+
+
+@template("MODIFIED_DURATION", "Macaulay duration {macaulay_duration}, yield to maturity {ytm} "
+          "(annual) — compute the modified duration.", answer_format=YEARS,
+          macaulay_duration=Draw(2, 10, 0.01), ytm=Draw(0.02, 0.1, 0.0025, percent=True))
+def _(macaulay_duration, ytm):
+    return {
+        "Using Macaulay duration directly": macaulay_duration,
+        "Multiplying by (1 + YTM)": macaulay_duration * (1 + ytm),
+    }
+
+
+@template("EFFECTIVE_DURATION", "Price {v0}; {v_minus} if yields fall and {v_plus} if they rise by "
+          "{delta_y} — compute the effective duration.", answer_format=YEARS,
+          v0=Draw(95, 105, 0.05), delta_y=Draw(0.0025, 0.01, 0.0025, percent=True),
+          up=Draw(1, 6, 0.05), down=Draw(1, 5, 0.05),
+          v_minus=Derive(lambda v: v["v0"] + v["up"]), v_plus=Derive(lambda v: v["v0"] - v["down"]))
+def _(v0, delta_y, up, down, v_minus, v_plus):
+    return {"Forgetting the 2 in the denominator": (v_minus - v_plus) / (v0 * delta_y)}
+
+
+@template("MONEY_DURATION", "Modified duration {modified_duration}, flat price {flat_price}, "
+          "accrued interest {accrued} — compute the money duration per 100 of par.",
+          answer_format=MONEY,
+          modified_duration=Draw(2, 10, 0.01), flat_price=Draw(90, 110, 0.05),
+          accrued=Draw(0.25, 3, 0.05), full_price=Derive(lambda v: v["flat_price"] + v["accrued"]))
+def _(modified_duration, flat_price, accrued, full_price):
+    return {"Using the flat price instead of the full price": modified_duration * flat_price}
+
+
+@template("PRICE_VALUE_BP", "Money duration {money_duration} — compute the price value of a basis "
+          "point.", answer_format=SMALL,
+          money_duration=Draw(200, 1000, 0.5))
+def _(money_duration):
+    return {"Using percentage instead of basis points": money_duration / 100}
+
+# -------------------------------------------------
+# GENERATION
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Problem:
+    formula_id: str
+    prompt: str
+    choices: tuple  # formatted answers, shuffled
+    answer: int     # index of the correct choice
+    traps: tuple    # per choice, the mistake that produces it ("" for the answer)
+
+    def check(self, choice):
+        return choice == self.answer
+
+
+def _display(value, percent):
+    if np.ndim(value):
+        return ", ".join(_display(v, percent) for v in value)
+    return f"{value * 100:g}%" if percent else f"{value:,g}"
+
+
+def _draw(template, count, rng):
+    values = {}
+    for name, spec in template.inputs.items():
+        if isinstance(spec, Derive):
+            values[name] = np.asarray(spec.func(values), dtype=float)
+        else:
+            shape = (count, spec.length) if spec.length else (count,)
+            steps = np.floor((spec.high - spec.low) / spec.step + 1e-9)
+            values[name] = spec.low + rng.integers(0, steps, shape, endpoint=True) * spec.step
+    return values
+
+
+@lru_cache(maxsize=None)
+def _arguments(formula_id):
+    return tuple(inspect.signature(EVALUATORS[formula_id]).parameters)
+
+
+def generate(formula_id, count, rng):
+    """`count` problems for one formula, inputs and answers computed in batch.
+
+    Rows whose traps round to the answer (or to each other) are redrawn; if a
+    row still has fewer than MIN_OPTIONS choices, calculation slips (multiples
+    near the answer) fill it up.
+    """
+    template = TEMPLATES[formula_id]
+    values = _draw(template, count, rng)
+    for _ in range(REDRAWS):
+        answers, options = _options(template, values, count)
+        short = np.flatnonzero([len(choices) < 1 + finite for choices, finite in options])
+        if not short.size:
+            break
+        fresh = _draw(template, short.size, rng)
+        for name in values:
+            values[name] = np.array(values[name])
+            values[name][short] = fresh[name]
+    answers, options = _options(template, values, count)
+
+    percent = {name: spec.percent for name, spec in template.inputs.items()}
+    problems = []
+    for i in range(count):
+        choices = options[i][0]
+        slips = _slips(answers[i])
+        while len(choices) < MIN_OPTIONS:
+            choices.setdefault(template.answer_format.format(next(slips)), SLIP)
+        order = rng.permutation(len(choices))
+        labels = tuple(choices)
+        problems.append(Problem(
+            formula_id=formula_id,
+            prompt=template.prompt.format(**{
+                name: _display(values[name][i], percent[name]) for name in values
+            }),
+            choices=tuple(labels[j] for j in order),
+            answer=int(np.flatnonzero(order == 0)[0]),
+            traps=tuple(choices[labels[j]] for j in order),
+        ))
+    return problems
+
+
+def _slips(answer):
+    """Wrong values near the answer: multiples of it, then offsets (for answers near 0)."""
+    for factor in SLIPS:
+        yield answer * factor
+    for offset in (0.01, 0.1, 1.0, 10.0):
+        yield answer + offset
+        yield answer - offset
+
+
+def _options(template, values, count):
+    """Answers, and per row ({formatted choice: trap label}, finite trap count)."""
+    answers = EVALUATORS[template.formula_id](
+        **{k: v for k, v in values.items() if k in _arguments(template.formula_id)}
+    )
+    traps = {label: np.broadcast_to(wrong, (count,)) for label, wrong in template.traps(**values).items()}
+    rows = []
+    for i in range(count):
+        choices = {template.answer_format.format(answers[i]): ""}
+        finite = 0
+        for label, wrong in traps.items():
+            if np.isfinite(wrong[i]):
+                finite += 1
+                choices.setdefault(template.answer_format.format(wrong[i]), label)
+        rows.append((choices, finite))
+    return answers, rows
+
+# -------------------------------------------------
+# POOL
+# -------------------------------------------------
+
+
+class ProblemPool:
+    """Ready problems per topic, topped up by a background thread."""
+
+    def __init__(self, bank, seed=None, batch_size=BATCH_SIZE, low_water=LOW_WATER):
+        self.topics = {
+            section: tuple(bank.ids[p] for p in positions if bank.ids[p] in TEMPLATES)
+            for section, positions in bank.sections.items()
+        }
+        self.topics = {topic: ids for topic, ids in self.topics.items() if ids}
+        self.batch_size = batch_size
+        self.low_water = low_water
+
+        self._rng = np.random.default_rng(seed)
+        self._rng_lock = threading.Lock()
+        self._ready = {topic: deque() for topic in self.topics}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="problem-pool", daemon=True)
+        self._thread.start()
+        for topic in self.topics:
+            self._request(topic)
+
+    def next(self, topic):
+        """Next problem for `topic`; only waits on generation when the pool is cold."""
+        with self._lock:
+            ready = self._ready[topic]
+            problem = ready.popleft() if ready else None
+            low = len(ready) < self.low_water
+
+        if problem is None:
+            problems = self._generate(topic)
+            problem = problems.pop()
+            with self._lock:
+                self._ready[topic].extend(problems)
+        elif low:
+            self._request(topic)
+        return problem
+
+    def ready(self, topic):
+        with self._lock:
+            return len(self._ready[topic])
+
+    def _request(self, topic):
+        with self._lock:
+            if topic in self._pending:
+                return
+            self._pending.add(topic)
+        self._queue.put(topic)
+
+    def _generate(self, topic):
+        ids = self.topics[topic]
+        with self._rng_lock:
+            counts = np.bincount(self._rng.integers(0, len(ids), self.batch_size), minlength=len(ids))
+            problems = [
+                problem
+                for formula_id, count in zip(ids, counts) if count
+                for problem in generate(formula_id, int(count), self._rng)
+            ]
+            order = self._rng.permutation(len(problems))
+        return [problems[i] for i in order]
+
+    def _run(self):
+        while True:
+            topic = self._queue.get()
+            problems = []
+            try:
+                problems = self._generate(topic)
+            except Exception:
+                # Keep the thread alive; the topic is requested again when it runs low.
+                log.exception("Could not refill practice problems for %s", topic)
+            finally:
+                with self._lock:
+                    self._ready[topic].extend(problems)
+                    self._pending.discard(topic)
+
+
+@lru_cache(maxsize=None)
+def get_pool(bank):
+    """Process-wide ProblemPool for a bank, started on first use."""
+    return ProblemPool(bank)
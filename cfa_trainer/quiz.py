@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Question selection and grading, independent of any UI.
+
+Answers are either a picked formula id (check) or a typed formula
+(check_text), graded by numeric equivalence. Typed answers are logged with
+chosen_id = TYPED + text; the marker keeps them out of the confusion
+matrices even when the text happens to equal a formula id.
+
+A QuizSession holds one trainee's state: the shuffled deck, the
+spaced-repetition schedule and the trainee's own confusion matrix. The
+Streamlit app keeps one in session state; scripts can drive it directly.
+Options are shuffled from (seed, questions asked), which rises with every
+question, so a reviewed card is laid out afresh each time it comes back
+while the same seed still replays the same session.
+"""
+
+import time
+from dataclasses import dataclass
+
+from .answer_log import ANONYMOUS, Answer
+from .confusion import ConfusionMatrix
+from .deck import Deck
+from .distractors import options
+from .scheduler import Scheduler
+
+TIMER_SECONDS = 15
+OPTION_COUNT = 4
+ORDERS = ("spaced", "deck")
+TYPED = "typed:"  # chosen_id prefix of typed answers; no bank id contains ':'
+
+# -------------------------------------------------
+# SESSION
+# -------------------------------------------------
+
+
+@dataclass(slots=True)
+class QuizSession:
+    bank: object
+    user: str
+    deck: Deck
+    scheduler: Scheduler
+    confusion: ConfusionMatrix  # this user's wrong picks
+    asked: int = 0              # questions drawn so far, in either order
+
+    @classmethod
+    def start(cls, bank, user=ANONYMOUS, seed=None, answers=()):
+        """New session; `answers` (e.g. the user's history) seed the schedule."""
+        deck = Deck.shuffled(len(bank), seed=seed)
+        session = cls(bank, user, deck, Scheduler(deck=deck), ConfusionMatrix())
+        for answer in answers:
+            session.learn(answer)
+        return session
+
+    def next_question(self, order="spaced", now=None):
+        """Id of the next formula to ask."""
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order {order!r}; expected one of {ORDERS}")
+        if order == "spaced":
+            position = self.scheduler.next(time.time() if now is None else now)
+        else:
+            position = self.deck.draw()
+        self.asked += 1
+        return self.bank.ids[position]
+
+    def options(self, question, difficulty="hard", confusion=()):
+        """Answer ids to offer for `question`; `confusion` adds shared matrices."""
+        return options(
+            self.bank,
+            question,
+            k=OPTION_COUNT,
+            rng=self.deck.rng(self.asked),
+            difficulty=difficulty,
+            confusion=(self.confusion, *confusion),
+        )
+
+    def check(self, question, choice, start_time, shown_at, now=None):
+        """Grade `choice` for `question`, learn from it and return the Answer."""
+        now = time.time() if now is None else now
+        answer = Answer(
+            user=self.user,
+            formula_id=question,
+            chosen_id=choice,
+            correct=is_correct(question, choice),
+            answered_at=now,
+            answer_seconds=now - shown_at,
+            think_seconds=shown_at - start_time,
+        )
+        self.learn(answer)
+        return answer
+
+    def check_text(self, question, text, start_time, shown_at, now=None):
+        """Grade a typed formula for `question`; returns (Answer, Verdict)."""
+        # Grading needs NumPy; importing it here keeps `import cfa_trainer` light.
+        from .equivalence import check
+
+        now = time.time() if now is None else now
+        verdict = check(self.bank, question, text)
+        answer = Answer(
+            user=self.user,
+            formula_id=question,
+            chosen_id=TYPED + text.strip(),
+            correct=verdict.correct,
+            answered_at=now,
+            answer_seconds=now - shown_at,
+            think_seconds=shown_at - start_time,
+        )
+        self.learn(answer)
+        return answer, verdict
+
+    def learn(self, answer):
+        bank = self.bank
+        if answer.formula_id not in bank:
+            return
+        position = bank.index[answer.formula_id]
+        self.scheduler.record(
+            position,
+            correct=answer.correct,
+            now=answer.answered_at,
+            response_time=answer.answer_seconds,
+        )
+        if not answer.correct and answer.chosen_id in bank:
+            self.confusion.update(position, bank.index[answer.chosen_id])
+
+
+def is_correct(question, choice):
+    return choice == question
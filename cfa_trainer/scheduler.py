@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Spaced-repetition review scheduler (SM-2 style).
+
+One Scheduler holds one user's review state. Every formula the user has
+seen has an ease factor, a repetition count, an interval and a due time;
+a heap keyed on due time gives the next review in O(log n). Formulas the
+user has not met yet are introduced in the order of a shuffled Deck once
+nothing is due. Intervals are in seconds, sized for a practice session
+rather than SM-2's days.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+
+FIRST_INTERVAL = 60
+SECOND_INTERVAL = 10 * 60
+RELEARN_INTERVAL = 30
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+FAST_ANSWER_SECONDS = 10
+
+# -------------------------------------------------
+# REVIEW STATE
+# -------------------------------------------------
+
+
+@dataclass(slots=True)
+class Card:
+    ease: float = INITIAL_EASE
+    reps: int = 0
+    interval: float = 0.0
+    due: float = 0.0
+
+
+def quality(correct, response_time=None):
+    """SM-2 answer quality (0-5) from correctness and response time."""
+    if not correct:
+        return 1
+    if response_time is not None and response_time <= FAST_ANSWER_SECONDS:
+        return 5
+    return 4
+
+
+def review(card, q, now):
+    """Apply one SM-2 review of quality q to card, in place."""
+    card.ease = max(MIN_EASE, card.ease + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+
+    if q < 3:
+        card.reps = 0
+        card.interval = RELEARN_INTERVAL
+    else:
+        card.reps += 1
+        if card.reps == 1:
+            card.interval = FIRST_INTERVAL
+        elif card.reps == 2:
+            card.interval = SECOND_INTERVAL
+        else:
+            card.interval *= card.ease
+
+    card.due = now + card.interval
+    return card
+
+# -------------------------------------------------
+# SCHEDULER
+# -------------------------------------------------
+
+
+@dataclass(slots=True)
+class Scheduler:
+    deck: object                 # Deck over bank positions, for new formulas
+    cards: dict = field(default_factory=dict)  # position -> Card
+    heap: list = field(default_factory=list)   # (due, position), lazily pruned
+
+    def _prune(self):
+        # Entries are left behind when a card is rescheduled; skip them here.
+        heap, cards = self.heap, self.cards
+        while heap and cards[heap[0][1]].due != heap[0][0]:
+            heapq.heappop(heap)
+
+    def next(self, now):
+        """Bank position to ask next: a due review, else a new formula."""
+        self._prune()
+        if self.heap and self.heap[0][0] <= now:
+            return self.heap[0][1]
+
+        if len(self.cards) < self.deck.size:
+            while True:
+                position = self.deck.draw()
+                if position not in self.cards:
+                    return position
+
+        return self.heap[0][1]
+
+    def record(self, position, correct, now, response_time=None):
+        card = self.cards.get(position)
+        if card is None:
+            card = self.cards[position] = Card()
+        review(card, quality(correct, response_time), now)
+        heapq.heappush(self.heap, (card.due, position))
+
+        if len(self.heap) > 2 * len(self.cards) + 16:
+            self.heap = [(c.due, pos) for pos, c in self.cards.items()]
+            heapq.heapify(self.heap)
+        return card
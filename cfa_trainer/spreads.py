@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Batch Z-spread solver.
+
+The Z-spread s of a bond is the constant spread over the spot curve that
+reproduces its price:
+
+    price = Σ CF_t / (1 + z_t + s)^t,  t = 1, 2, ... periods
+
+solve_z_spread() takes a padded (bonds, periods) cash-flow matrix, one
+price per bond and a spot curve (one for all bonds, or one per bond) and
+runs Newton's method on every bond at once, compressing the active set as
+bonds converge. With non-negative cash flows the price is decreasing and
+convex in s, so Newton converges monotonically once it is left of the
+root; steps that would push 1 + z_t + s to zero or below are damped.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+GUESS = 0.0
+TOL = 1e-12
+NEWTON_STEPS = 100
+FLOOR = 1e-9  # smallest 1 + z_t + s allowed while iterating
+
+# -------------------------------------------------
+# PRICING
+# -------------------------------------------------
+
+
+def spread_price(cash_flows, spot_rates, spread):
+    """Price of each row at `spread` over the spot curve, and dPrice/ds."""
+    cf = np.asarray(cash_flows, dtype=float)
+    t = np.arange(1, cf.shape[-1] + 1)
+    base = 1.0 + np.asarray(spot_rates, dtype=float)[..., :cf.shape[-1]] + np.asarray(spread)[..., None]
+    pv = cf * base ** -t
+    return pv.sum(axis=-1), -(t * pv / base).sum(axis=-1)
+
+# -------------------------------------------------
+# SOLVER
+# -------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class ZSpreadResult:
+    spread: np.ndarray      # (bonds,), NaN where Newton did not converge
+    converged: np.ndarray   # (bonds,) bool
+    iterations: np.ndarray  # (bonds,) Newton steps taken
+
+    def __len__(self):
+        return len(self.spread)
+
+
+def solve_z_spread(cash_flows, prices, spot_rates, guess=GUESS, tol=TOL, iterations=NEWTON_STEPS):
+    """Z-spread per bond for a (bonds, periods) cash-flow matrix (t = 1, 2, ...)."""
+    cf = np.asarray(cash_flows, dtype=float)
+    if cf.ndim != 2:
+        raise ValueError(f"Expected a 2-D (bonds, periods) array, got shape {cf.shape}")
+    bonds, periods = cf.shape
+    price = np.broadcast_to(np.asarray(prices, dtype=float), (bonds,))
+    z = np.asarray(spot_rates, dtype=float)
+    if z.shape[-1] < periods:
+        raise ValueError(f"Cash flows run {periods} periods, the spot curve only {z.shape[-1]}")
+    z = np.broadcast_to(z[..., :periods], (bonds, periods))
+    # Lowest spread that keeps every discount base positive, per bond.
+    lowest = FLOOR - 1.0 - z.min(axis=1)
+
+    spread = np.full(bonds, np.nan)
+    converged = np.zeros(bonds, dtype=bool)
+    steps = np.zeros(bonds, dtype=np.int64)
+
+    active = np.flatnonzero(price > 0)
+    current = np.maximum(np.full(active.size, float(guess)), lowest[active])
+    with np.errstate(all="ignore"):
+        for step_count in range(1, iterations + 1):
+            if not active.size:
+                break
+            value, slope = spread_price(cf[active], z[active], current)
+            step = (value - price[active]) / slope
+            # Halve the distance to the floor instead of stepping past it.
+            floor = lowest[active]
+            current = np.where(current - step > floor, current - step, 0.5 * (current + floor))
+            steps[active] = step_count
+            done = np.abs(step) <= tol * (1.0 + np.abs(current))
+            bad = ~np.isfinite(current)
+            finished = done & ~bad
+            spread[active[finished]] = current[finished]
+            converged[active[finished]] = True
+            keep = ~(done | bad)
+            active, current = active[keep], current[keep]
+    return ZSpreadResult(spread=spread, converged=converged, iterations=steps)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Per-formula accuracy and response-time statistics.
+
+FormulaStats keeps flat NumPy arrays indexed by bank position: attempts,
+correct answers, Welford mean / M2 of the response time and a fixed-bin
+response-time histogram. Each answer updates them in O(1); reading the
+aggregates for a formula is O(1) too. Two FormulaStats (e.g. built from
+different chunks of the answer log) merge with Chan's parallel formula.
+"""
+
+import threading
+
+import numpy as np
+
+from .answer_log import DB_PATH, connect
+
+# Response-time histogram bin edges, in seconds (last bin is open-ended).
+HIST_EDGES = np.array([0, 2, 4, 6, 8, 10, 15, 20, 30, 60, np.inf])
+CHUNK_ROWS = 100_000
+
+# -------------------------------------------------
+# AGGREGATES
+# -------------------------------------------------
+
+
+class FormulaStats:
+    def __init__(self, size):
+        self.size = size
+        self.attempts = np.zeros(size, dtype=np.int64)
+        self.correct = np.zeros(size, dtype=np.int64)
+        self.timed = np.zeros(size, dtype=np.int64)  # attempts with a response time
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.hist = np.zeros((size, len(HIST_EDGES) - 1), dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def update(self, position, correct, seconds=None):
+        with self._lock:
+            self.attempts[position] += 1
+            self.correct[position] += bool(correct)
+            if seconds is None:
+                return
+
+            n = self.timed[position] = self.timed[position] + 1
+            delta = seconds - self.mean[position]
+            self.mean[position] += delta / n
+            self.m2[position] += delta * (seconds - self.mean[position])
+            self.hist[position, _bin(seconds)] += 1
+
+    def ingest(self, positions, correct, seconds):
+        """Vectorized update from parallel arrays (NaN seconds = untimed)."""
+        chunk = FormulaStats(self.size)
+        positions = np.asarray(positions, dtype=np.int64)
+        seconds = np.asarray(seconds, dtype=float)
+
+        chunk.attempts = np.bincount(positions, minlength=self.size)
+        chunk.correct = np.bincount(
+            positions, weights=np.asarray(correct, dtype=float), minlength=self.size
+        ).astype(np.int64)
+
+        timed = ~np.isnan(seconds)
+        positions, seconds = positions[timed], seconds[timed]
+        chunk.timed = np.bincount(positions, minlength=self.size)
+        totals = np.bincount(positions, weights=seconds, minlength=self.size)
+        np.divide(totals, chunk.timed, out=chunk.mean, where=chunk.timed > 0)
+        chunk.m2 = np.bincount(
+            positions, weights=(seconds - chunk.mean[positions]) ** 2, minlength=self.size
+        )
+        np.add.at(chunk.hist, (positions, _bin(seconds)), 1)
+
+        self.merge(chunk)
+
+    def merge(self, other):
+        with self._lock:
+            n_a, n_b = self.timed, other.timed
+            n = n_a + n_b
+            delta = other.mean - self.mean
+            safe_n = np.maximum(n, 1)
+
+            self.m2 = self.m2 + other.m2 + delta ** 2 * n_a * n_b / safe_n
+            self.mean = self.mean + delta * n_b / safe_n
+            self.timed = n
+            self.attempts = self.attempts + other.attempts
+            self.correct = self.correct + other.correct
+            self.hist = self.hist + other.hist
+        return self
+
+    # ---------------------------------------------
+    # READS (O(1) per formula)
+    # ---------------------------------------------
+
+    def accuracy(self, position):
+        n = self.attempts[position]
+        return self.correct[position] / n if n else float("nan")
+
+    def variance(self, position):
+        n = self.timed[position]
+        return self.m2[position] / (n - 1) if n > 1 else float("nan")
+
+    def summary(self):
+        """Column arrays for the whole bank."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {
+                "attempts": self.attempts.copy(),
+                "accuracy": np.where(self.attempts > 0, self.correct / self.attempts, np.nan),
+                "mean_seconds": np.where(self.timed > 0, self.mean, np.nan),
+                "sd_seconds": np.where(
+                    self.timed > 1, np.sqrt(self.m2 / (self.timed - 1)), np.nan
+                ),
+                "histogram": self.hist.copy(),
+            }
+
+
+def _bin(seconds):
+    bins = np.searchsorted(HIST_EDGES, seconds, side="right") - 1
+    return np.clip(bins, 0, len(HIST_EDGES) - 2)
+
+# -------------------------------------------------
+# PROCESS-WIDE INSTANCE
+# -------------------------------------------------
+
+
+def from_log(bank, path=DB_PATH):
+    """Build stats with one chunked pass over the answer log."""
+    stats = FormulaStats(len(bank))
+    conn = connect(path)
+    try:
+        cursor = conn.execute("SELECT formula_id, correct, answer_seconds FROM answers")
+        while rows := cursor.fetchmany(CHUNK_ROWS):
+            rows = [row for row in rows if row[0] in bank.index]
+            if not rows:
+                continue
+            ids, correct, seconds = zip(*rows)
+            stats.ingest(
+                [bank.index[formula_id] for formula_id in ids],
+                correct,
+                [np.nan if s is None else s for s in seconds],
+            )
+    finally:
+        conn.close()
+    return stats
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_stats(bank):
+    """Stats shared by all sessions; the log is read only on first use."""
+    with _stats_lock:
+        if bank not in _stats:
+            _stats[bank] = from_log(bank)
+        return _stats[bank]
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Mock exam page: a full paper under one global timer, graded in one pass.
+
+Each page of items is a form, so picking answers does not rerun the
+script; the server is only hit when changing pages and on submission. The
+browser countdown submits the open page just before time runs out, so its
+picks are graded too.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cfa_trainer import load_bank
+from cfa_trainer.answer_log import ANONYMOUS, Answer, get_log
+from cfa_trainer.confusion import get_confusion
+from cfa_trainer.distractors import DIFFICULTIES
+from cfa_trainer.exam import BLANK, EXAM_SIZES, blank_answers, build_exam, grade_exam
+from cfa_trainer.stats import get_stats
+from widgets import countdown
+
+BANK = load_bank()
+ITEMS_PER_PAGE = 15
+SUBMIT_TOLERANCE = 0.5
+AUTO_SUBMIT_SECONDS = 2  # the browser submits the open page this long before time-up
+SUBMIT_LABEL = "Submit exam"
+
+# -------------------------------------------------
+# EXAM STATE
+# -------------------------------------------------
+
+
+def start_exam(items, difficulty):
+    exam = build_exam(BANK, items=items, difficulty=difficulty)
+    st.session_state.exam = exam
+    st.session_state.exam_answers = blank_answers(exam)
+    st.session_state.exam_page = 0
+    st.session_state.exam_started = time.time()
+    st.session_state.exam_result = None
+
+
+def save_page(exam, page):
+    answers = st.session_state.exam_answers
+    for item in page_items(exam, page):
+        choice = st.session_state.get(f"exam_{exam.seed}_{item}")
+        answers[item] = BLANK if choice is None else choice
+
+
+def submit_exam():
+    exam = st.session_state.exam
+    answers = st.session_state.exam_answers
+    result = grade_exam(BANK, exam, answers)
+    st.session_state.exam_result = result
+
+    # Feed the shared statistics and answer log with the answered items.
+    now = time.time()
+    answered = result.answered
+    get_stats(BANK).ingest(
+        exam.questions[answered], result.correct[answered], np.full(answered.sum(), np.nan)
+    )
+    confusion, log = get_confusion(BANK), get_log()
+    user = st.session_state.get("trainee", ANONYMOUS)
+    for item in np.flatnonzero(answered):
+        question, choice = int(exam.questions[item]), int(answers[item])
+        confusion.update(question, choice)
+        log.record(Answer(
+            user=user,
+            formula_id=BANK.ids[question],
+            chosen_id=BANK.ids[choice],
+            correct=bool(result.correct[item]),
+            answered_at=now,
+        ))
+
+
+def page_items(exam, page):
+    return range(page * ITEMS_PER_PAGE, min((page + 1) * ITEMS_PER_PAGE, len(exam)))
+
+
+def time_up():
+    exam = st.session_state.exam
+    if time.time() - st.session_state.exam_started >= exam.seconds - SUBMIT_TOLERANCE:
+        save_page(exam, st.session_state.exam_page)
+        submit_exam()
+        st.rerun()
+
+# -------------------------------------------------
+# UI
+# -------------------------------------------------
+
+st.title("📝 CFA Level I – Mock Exam")
+st.markdown("**One global timer. Answers are graded when you submit or time runs out.**")
+
+st.divider()
+
+exam = st.session_state.get("exam")
+result = st.session_state.get("exam_result")
+
+if exam is None:
+    items = st.radio("Items", EXAM_SIZES, horizontal=True)
+    difficulty = st.selectbox("Distractor difficulty", DIFFICULTIES[:3], index=2)
+    if st.button("Start exam"):
+        start_exam(items, difficulty)
+        st.rerun()
+
+elif result is None:
+    remaining = exam.seconds - (time.time() - st.session_state.exam_started)
+    if remaining <= SUBMIT_TOLERANCE:
+        save_page(exam, st.session_state.exam_page)
+        submit_exam()
+        st.rerun()
+
+    countdown(remaining, label="⏳ Time left:", click=SUBMIT_LABEL, click_at=AUTO_SUBMIT_SECONDS)
+    st.fragment(time_up, run_every=remaining)()
+
+    page = st.session_state.exam_page
+    pages = -(-len(exam) // ITEMS_PER_PAGE)
+    answers = st.session_state.exam_answers
+    st.caption(
+        f"Page {page + 1} of {pages} · {(answers != BLANK).sum()} of {len(exam)} answered"
+        " · answers are saved when you change page, submit or time runs out"
+    )
+
+    with st.form(f"exam_page_{page}"):
+        for item in page_items(exam, page):
+            offered = [int(p) for p in exam.options[item]]
+            saved = int(answers[item])
+            st.radio(
+                f"**{item + 1}.** {BANK.formulas[exam.questions[item]].question}",
+                offered,
+                index=offered.index(saved) if saved in offered else None,
+                format_func=lambda position: BANK.formulas[position].formula,
+                key=f"exam_{exam.seed}_{item}",
+            )
+
+        previous, following, submit = st.columns(3)
+        go_back = previous.form_submit_button("◀ Previous", disabled=page == 0)
+        go_next = following.form_submit_button("Next ▶", disabled=page == pages - 1)
+        done = submit.form_submit_button(SUBMIT_LABEL, type="primary")
+
+    if go_back or go_next or done:
+        save_page(exam, page)
+        if done:
+            submit_exam()
+        else:
+            st.session_state.exam_page = page + (1 if go_next else -1)
+        st.rerun()
+
+else:
+    st.metric("Score", f"{result.score} / {len(exam)}", f"{result.percent:.1f}%")
+
+    st.dataframe(
+        pd.DataFrame({
+            "Section": result.sections,
+            "Items": result.section_items,
+            "Correct": result.section_correct,
+        }).query("Items > 0"),
+        hide_index=True,
+    )
+
+    with st.expander("Review missed items"):
+        answers = st.session_state.exam_answers
+        for item in np.flatnonzero(~result.correct):
+            formula = BANK.formulas[exam.questions[item]]
+            picked = answers[item]
+            st.markdown(f"**{item + 1}.** {formula.question}")
+            st.markdown(f"Correct formula: `{formula.formula}`")
+            if picked != BLANK:
+                st.markdown(f"Your answer: `{BANK.formulas[picked].formula}`")
+            st.warning(f"⚠️ Common trap: {formula.trap}")
+
+    if st.button("New exam"):
+        st.session_state.exam = None
+        st.rerun()
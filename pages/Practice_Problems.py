@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Practice problems page: numeric questions with trap answers, by topic.
+
+Problems come ready-made from the shared ProblemPool, which refills each
+topic in the background, so "Next question" never waits on generation.
+"""
+
+import streamlit as st
+
+from cfa_trainer import load_bank
+from cfa_trainer.problems import get_pool
+
+BANK = load_bank()
+POOL = get_pool(BANK)
+
+
+def next_problem():
+    st.session_state.problem = POOL.next(st.session_state.topic)
+    st.session_state.problem_checked = False
+
+
+st.title("🧮 CFA Level I – Practice Problems")
+st.markdown("**Compute the answer. Wrong options are the classic mistakes.**")
+
+st.selectbox("Topic", list(POOL.topics), key="topic", on_change=next_problem)
+
+if "problem" not in st.session_state:
+    next_problem()
+
+st.divider()
+
+problem = st.session_state.problem
+st.subheader("📌 Problem")
+st.write(problem.prompt)
+
+choice = st.radio(
+    "Your answer",
+    range(len(problem.choices)),
+    format_func=lambda i: problem.choices[i],
+    index=None,
+    disabled=st.session_state.problem_checked,
+    key=f"problem_{id(problem)}",
+)
+
+if not st.session_state.problem_checked:
+    if st.button("Check", disabled=choice is None):
+        st.session_state.problem_checked = True
+        st.rerun()
+else:
+    formula = BANK[problem.formula_id]
+    if problem.check(choice):
+        st.success("✅ Correct.")
+    else:
+        st.error(f"❌ Incorrect. The answer is {problem.choices[problem.answer]}.")
+        st.warning(f"⚠️ That is the trap: {problem.traps[choice]}.")
+    st.markdown(f"**Formula:** `{formula.formula}`")
+    st.caption(f"Common trap: {formula.trap}")
+
+    if st.button("Next question"):
+        next_problem()
+        st.rerun()
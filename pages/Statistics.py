@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Statistics page: accuracy and response time per formula.
+"""
+
+import pandas as pd
+import streamlit as st
+
+from cfa_trainer import load_bank
+from cfa_trainer.confusion import get_confusion
+from cfa_trainer.stats import HIST_EDGES, get_stats
+
+BANK = load_bank()
+
+st.title("📊 Formula Statistics")
+st.markdown("**Accuracy and time to answer, across all trainees.**")
+
+st.divider()
+
+summary = get_stats(BANK).summary()
+confusion = get_confusion(BANK)
+
+
+def most_confused(position):
+    other = confusion.most_confused(position)
+    return None if other is None else BANK.ids[other]
+
+
+table = pd.DataFrame({
+    "Formula": BANK.ids,
+    "Section": [formula.section for formula in BANK.formulas],
+    "Attempts": summary["attempts"],
+    "Accuracy": summary["accuracy"],
+    "Mean time (s)": summary["mean_seconds"],
+    "SD time (s)": summary["sd_seconds"],
+    "Time histogram": list(summary["histogram"]),
+    "Most confused with": [most_confused(position) for position in range(len(BANK))],
+})
+
+sections = st.multiselect("Sections", list(BANK.sections))
+if sections:
+    table = table[table["Section"].isin(sections)]
+
+st.dataframe(
+    table,
+    hide_index=True,
+    column_config={
+        "Accuracy": st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+        "Mean time (s)": st.column_config.NumberColumn(format="%.1f"),
+        "SD time (s)": st.column_config.NumberColumn(format="%.1f"),
+        "Time histogram": st.column_config.BarChartColumn(
+            help="Bins (s): " + ", ".join(f"{e:g}" for e in HIST_EDGES[:-1]) + "+",
+        ),
+    },
+)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Streamlit widgets shared by the trainer pages.
+"""
+
+import json
+
+import streamlit as st
+
+
+def countdown(seconds, label="⏳ Think...", click=None, click_at=0):
+    """Countdown that ticks in the browser, with no server reruns.
+
+    With `click`, the browser also clicks the page's button with that label
+    once `click_at` seconds are left (e.g. to submit a form before time-up).
+    """
+    st.iframe(
+        f"""
+        <div id="timer" style="font-family: sans-serif; padding: 0.75rem 1rem;
+             border-radius: 0.5rem; background: rgba(28, 131, 225, 0.1);
+             color: rgb(0, 66, 128);"></div>
+        <script>
+        const end = Date.now() + {seconds * 1000:.0f};
+        const el = document.getElementById("timer");
+        const click = {json.dumps(click)}, clickEnd = end - {click_at * 1000:.0f};
+        let clicked = click === null;
+        function fmt(left) {{
+            if (left < 60) return left + " seconds";
+            const m = Math.floor(left / 60), s = left % 60;
+            return m + ":" + String(s).padStart(2, "0");
+        }}
+        function tick() {{
+            const left = Math.max(0, Math.ceil((end - Date.now()) / 1000));
+            el.textContent = "{label} " + fmt(left);
+            if (!clicked && Date.now() >= clickEnd) {{
+                const button = [...window.parent.document.querySelectorAll("button")]
+                    .find(b => b.innerText.trim() === click);
+                if (button) {{ button.click(); clicked = true; }}
+            }}
+            if (left > 0) setTimeout(tick, 250);
+        }}
+        tick();
+        </script>
+        """,
+        height=60,
+    )